@@ -0,0 +1,25 @@
+import asyncio
+import os
+import sys
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+from cogs.economy import BalancePartitions, BalanceServer
+
+# Shared economy for running several bot processes (e.g. one per shard).
+# Start this once, then point every bot at it with the same ECONOMY_SERVER value:
+#   ECONOMY_SERVER=unix:/tmp/economy.sock python balance_server.py
+#   ECONOMY_SERVER=tcp:127.0.0.1:7400 python balance_server.py
+
+if __name__ == "__main__":
+    address = sys.argv[1] if len(sys.argv) > 1 else os.getenv("ECONOMY_SERVER")
+    if not address:
+        print("❌ ERROR: pass an address (unix:/path or tcp:host:port) or set ECONOMY_SERVER")
+    else:
+        server = BalanceServer(BalancePartitions(), address)
+        try:
+            asyncio.run(server.serve_forever())
+        except KeyboardInterrupt:
+            pass
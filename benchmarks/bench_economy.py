@@ -0,0 +1,166 @@
+"""Load test for the economy API in cogs/economy.py.
+
+Seeds a throwaway balance database with a synthetic population, then drives
+get_balance / can_afford / update_balance and the leaderboard path
+(top_balances + get_rank) from many concurrent tasks. Reports p50/p99 latency
+per operation, how long the event loop was blocked, and bytes written per
+operation.
+
+    python benchmarks/bench_economy.py --users 1000 100000 1000000 --ops 20000 --concurrency 50
+
+Pass --server unix:/path (or tcp:host:port) to measure a running
+balance_server.py instead of the in-process store; population seeding is
+skipped in that case.
+"""
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Operation mix: name -> weight
+DEFAULT_MIX = {"get_balance": 40, "can_afford": 20, "update_balance": 30, "leaderboard": 10}
+
+def seed_population(db_path, users):
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE IF NOT EXISTS balances (user_id INTEGER PRIMARY KEY, balance INTEGER NOT NULL)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_balances_balance ON balances(balance)")
+    rng = random.Random(users)
+    batch = 50000
+    for start in range(0, users, batch):
+        conn.executemany(
+            "INSERT OR REPLACE INTO balances (user_id, balance) VALUES (?, ?)",
+            ((user_id, rng.randint(0, 100000)) for user_id in range(start, min(start + batch, users))),
+        )
+    conn.commit()
+    conn.close()
+
+def written_bytes():
+    """Bytes this process has passed to write() so far, or None if unavailable"""
+    try:
+        with open("/proc/self/io") as f:
+            for line in f:
+                if line.startswith("wchar:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+async def watch_loop(stop, interval=0.001, threshold=0.005):
+    """Measure how late the loop wakes a sleeping task; lateness is blocking"""
+    blocked, worst = 0.0, 0.0
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        lag = time.perf_counter() - started - interval
+        if lag > threshold:
+            blocked += lag
+            worst = max(worst, lag)
+    return blocked, worst
+
+async def run_workload(economy, users, ops, concurrency, mix):
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    rng = random.Random(ops)
+    plan = rng.choices(names, weights, k=ops)
+    latencies = {name: [] for name in names}
+    queue = iter(plan)
+
+    async def one(op):
+        user_id = rng.randrange(users * 2)  # about half are players without a row
+        if op == "get_balance":
+            await economy.get_balance(user_id)
+        elif op == "can_afford":
+            await economy.can_afford(user_id, 500)
+        elif op == "update_balance":
+            await economy.update_balance(user_id, rng.randint(-500, 500))
+        else:
+            await economy.top_balances(economy.LEADERBOARD_PAGE_SIZE)
+            await economy.get_rank(user_id)
+
+    async def worker():
+        for op in queue:
+            started = time.perf_counter()
+            await one(op)
+            latencies[op].append(time.perf_counter() - started)
+
+    stop = asyncio.Event()
+    watcher = asyncio.create_task(watch_loop(stop))
+    bytes_before = written_bytes()
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    bytes_after = written_bytes()
+    stop.set()
+    blocked, worst = await watcher
+    written = None if bytes_before is None else bytes_after - bytes_before
+    return latencies, elapsed, blocked, worst, written
+
+def report(users, ops, latencies, elapsed, blocked, worst, written):
+    print(f"\n=== {users:,} users, {ops:,} ops in {elapsed:.2f}s ({ops / elapsed:,.0f} ops/s) ===")
+    print(f"{'operation':<16}{'count':>8}{'p50 ms':>10}{'p99 ms':>10}")
+    for op, samples in latencies.items():
+        print(f"{op:<16}{len(samples):>8}{percentile(samples, 50) * 1000:>10.3f}{percentile(samples, 99) * 1000:>10.3f}")
+    print(f"event loop blocked: {blocked * 1000:.1f} ms total, worst stall {worst * 1000:.1f} ms")
+    if written is None:
+        print("bytes written/op: unavailable (no /proc/self/io)")
+    else:
+        print(f"bytes written/op: {written / ops:,.1f}")
+
+async def bench(users, args, mix):
+    import cogs.economy as economy
+    if not args.server:
+        # Opening the store starts the rank index build in the background;
+        # wait for it so the run measures the index, not the SQL fallback
+        started = time.perf_counter()
+        await economy.top_balances(1)
+        store = economy._backend.partitions.store()
+        while store.ranks is None:
+            await asyncio.sleep(0.01)
+        print(f"opened store and built rank index for {users:,} users in {time.perf_counter() - started:.2f}s")
+    results = await run_workload(economy, users, args.ops, args.concurrency, mix)
+    await economy._backend.aclose()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, nargs="+", default=[1000, 100000], help="population sizes to test")
+    parser.add_argument("--ops", type=int, default=20000, help="operations per run")
+    parser.add_argument("--concurrency", type=int, default=50, help="concurrent tasks issuing operations")
+    parser.add_argument("--server", help="benchmark a running balance server at this address")
+    for op, weight in DEFAULT_MIX.items():
+        parser.add_argument(f"--{op.replace('_', '-')}-weight", type=int, default=weight, dest=f"{op}_weight")
+    args = parser.parse_args()
+    mix = {op: getattr(args, f"{op}_weight") for op in DEFAULT_MIX}
+
+    sys.path.insert(0, REPO_ROOT)
+    if args.server:
+        os.environ["ECONOMY_SERVER"] = args.server
+    else:
+        os.environ.pop("ECONOMY_SERVER", None)
+
+    for users in args.users:
+        with tempfile.TemporaryDirectory(prefix="economy-bench-") as workdir:
+            # The economy module uses paths relative to the working directory
+            os.chdir(workdir)
+            if not args.server:
+                started = time.perf_counter()
+                seed_population("player_balances.db", users)
+                print(f"\nseeded {users:,} users in {time.perf_counter() - started:.2f}s")
+            sys.modules.pop("cogs.economy", None)
+            report(users, args.ops, *asyncio.run(bench(users, args, mix)))
+            os.chdir(REPO_ROOT)
+
+if __name__ == "__main__":
+    main()
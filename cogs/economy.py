@@ -1,71 +1,1033 @@
 import discord
 from discord import app_commands
-from discord.ext import commands
+from discord.ext import commands, tasks
+import asyncio
+import gc
+import itertools
 import json
+import mmap
 import os
+import random
+import sqlite3
+import struct
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime, timezone
+from typing import Optional
 
-CURRENCY_FILE = "player_balances.json"
+BALANCE_DB_FILE = "player_balances.db"
+# Set to "unix:/path/to.sock" or "tcp:host:port" to use a shared balance server
+ECONOMY_SERVER = os.getenv("ECONOMY_SERVER")
+# A call to the balance server that gets no reply within this fails instead
+# of holding its user's lock forever
+ECONOMY_CALL_TIMEOUT_SECONDS = 10
+# Give every guild its own balances, leaderboard and ledger
+ECONOMY_PER_GUILD = os.getenv("ECONOMY_PER_GUILD", "false").lower() == "true"
+ECONOMY_PARTITION_DIR = "economies"
+PARTITION_IDLE_MINUTES = 30
+# Stakes of rounds nobody settles (the bot process died mid-game, or a reply
+# was lost) are released after this long. Game views time out long before.
+ROUND_HOLD_TTL_MINUTES = 120
 STARTING_BALANCE = 10000
+LEADERBOARD_PAGE_SIZE = 10
+LOCK_STRIPES = 64
+
+# Leaderboard name/avatar lookups
+USER_CACHE_TTL_SECONDS = 15 * 60
+USER_CACHE_MAX_ENTRIES = 5000
+USER_FETCH_CONCURRENCY = 5
+
+# Binary ledger of settled game rounds
+LEDGER_FILE = "casino_ledger.bin"
+# user_id, delta, unix time, game code, padding to 24 bytes
+LEDGER_RECORD = struct.Struct("<QqIHxx")
+LEDGER_SCAN_RECORDS = 4096
+GAME_CODES = {"blackjack": 1, "baccarat": 2, "mines": 3, "tower": 4}
+GAME_NAMES = {code: name for name, code in GAME_CODES.items()}
 
-# In-memory cache for balances
-_balances_cache = {}
+# Legacy JSON store, migrated into SQLite the first time the database is opened
+CURRENCY_FILE = "player_balances.json"
+JOURNAL_FILE = "player_balances.journal"
+
+def _replay_journal(path, balances):
+    """Apply legacy journal entries on top of a snapshot. Each line holds the
+    absolute balance after a change, so replaying an entry twice is harmless."""
+    if not os.path.exists(path):
+        return 0
+    applied = 0
+    with open(path, 'r') as f:
+        for line in f:
+            try:
+                user_id_str, balance = json.loads(line)
+            except (ValueError, TypeError):
+                # Torn write from a crash mid-append
+                continue
+            balances[user_id_str] = balance
+            applied += 1
+    return applied
 
-def load_balances():
-    """Load player balances from file"""
-    global _balances_cache
-    if _balances_cache:
-        return _balances_cache
-        
+def load_legacy_balances():
+    """Read balances from the old JSON snapshot plus any journal entries"""
     try:
-        if not os.path.exists(CURRENCY_FILE):
-            _balances_cache = {}
-            return _balances_cache
         with open(CURRENCY_FILE, 'r') as f:
             data = json.load(f)
-            _balances_cache = data if isinstance(data, dict) else {}
-            return _balances_cache
+            balances = data if isinstance(data, dict) else {}
     except (FileNotFoundError, json.JSONDecodeError):
-        _balances_cache = {}
-        return _balances_cache
-
-def save_balances(balances):
-    """Save player balances to file"""
-    global _balances_cache
-    _balances_cache = balances
-    with open(CURRENCY_FILE, 'w') as f:
-        json.dump(balances, f, indent=2)
-
-def get_balance(user_id):
-    """Get player's balance, create if doesn't exist"""
-    balances = load_balances()
-    user_id_str = str(user_id)
-    if user_id_str not in balances:
-        balances[user_id_str] = STARTING_BALANCE
-        save_balances(balances)
-    return balances[user_id_str]
-
-def update_balance(user_id, amount):
+        balances = {}
+    _replay_journal(JOURNAL_FILE + ".1", balances)
+    _replay_journal(JOURNAL_FILE, balances)
+    return balances
+
+class _End:
+    """Sentinel that sorts after every key in the skip list"""
+    def __lt__(self, other): return False
+    def __le__(self, other): return False
+    def __gt__(self, other): return True
+    def __ge__(self, other): return True
+
+class _Node:
+    __slots__ = ("key", "next", "width")
+
+    def __init__(self, key, next, width):
+        self.key, self.next, self.width = key, next, width
+
+_NIL = _Node(_End(), [], [])
+
+class RankIndex:
+    """Players ordered by balance (richest first) in an indexable skip list.
+
+    Every node stores how many positions each of its links skips, so updating
+    a balance, looking up a player's rank and jumping to any rank are all
+    O(log n). The first page is cached until a change reaches into it.
+    """
+
+    MAX_LEVELS = 32
+
+    def __init__(self):
+        self._head = _Node(None, [_NIL] * self.MAX_LEVELS, [1] * self.MAX_LEVELS)
+        self._balances = {}
+        self._top_cache = None
+
+    def __len__(self):
+        return len(self._balances)
+
+    def balance(self, user_id):
+        return self._balances.get(user_id)
+
+    def _random_level(self):
+        level = 1
+        while level < self.MAX_LEVELS and random.random() < 0.5:
+            level += 1
+        return level
+
+    def build(self, rows):
+        """Bulk-load (user_id, balance) rows already sorted richest first, in O(n)"""
+        chain = [self._head] * self.MAX_LEVELS
+        chain_pos = [0] * self.MAX_LEVELS
+        position = 0
+        for user_id, balance in rows:
+            position += 1
+            self._balances[user_id] = balance
+            level = self._random_level()
+            node = _Node((-balance, user_id), [_NIL] * level, [0] * level)
+            for i in range(level):
+                chain[i].next[i] = node
+                chain[i].width[i] = position - chain_pos[i]
+                chain[i], chain_pos[i] = node, position
+        for i in range(self.MAX_LEVELS):
+            chain[i].width[i] = position + 1 - chain_pos[i]
+        self._top_cache = None
+
+    def _insert(self, key):
+        chain = [None] * self.MAX_LEVELS
+        steps_at_level = [0] * self.MAX_LEVELS
+        node = self._head
+        for i in reversed(range(self.MAX_LEVELS)):
+            while node.next[i].key <= key:
+                steps_at_level[i] += node.width[i]
+                node = node.next[i]
+            chain[i] = node
+        level = self._random_level()
+        new_node = _Node(key, [None] * level, [None] * level)
+        steps = 0
+        for i in range(level):
+            prev = chain[i]
+            new_node.next[i] = prev.next[i]
+            prev.next[i] = new_node
+            new_node.width[i] = prev.width[i] - steps
+            prev.width[i] = steps + 1
+            steps += steps_at_level[i]
+        for i in range(level, self.MAX_LEVELS):
+            chain[i].width[i] += 1
+
+    def _remove(self, key):
+        chain = [None] * self.MAX_LEVELS
+        node = self._head
+        for i in reversed(range(self.MAX_LEVELS)):
+            while node.next[i].key < key:
+                node = node.next[i]
+            chain[i] = node
+        target = chain[0].next[0]
+        for i in range(len(target.next)):
+            chain[i].width[i] += target.width[i] - 1
+            chain[i].next[i] = target.next[i]
+        for i in range(len(target.next), self.MAX_LEVELS):
+            chain[i].width[i] -= 1
+
+    def _touches_top(self, key):
+        cache = self._top_cache
+        if cache is None:
+            return False
+        if len(cache) < LEADERBOARD_PAGE_SIZE:
+            return True
+        last_user_id, last_balance = cache[-1]
+        return key <= (-last_balance, last_user_id)
+
+    def set(self, user_id, balance):
+        old_balance = self._balances.get(user_id)
+        if old_balance == balance:
+            return
+        new_key = (-balance, user_id)
+        if old_balance is not None:
+            old_key = (-old_balance, user_id)
+            if self._touches_top(old_key):
+                self._top_cache = None
+            self._remove(old_key)
+        if self._touches_top(new_key):
+            self._top_cache = None
+        self._balances[user_id] = balance
+        self._insert(new_key)
+
+    def rank(self, user_id):
+        """1-based rank of a player, or None if they have no balance yet"""
+        balance = self._balances.get(user_id)
+        if balance is None:
+            return None
+        key = (-balance, user_id)
+        position = 0
+        node = self._head
+        for i in reversed(range(self.MAX_LEVELS)):
+            while node.next[i].key < key:
+                position += node.width[i]
+                node = node.next[i]
+        return position + 1
+
+    def page(self, offset, limit):
+        """(user_id, balance) rows for ranks offset+1 .. offset+limit"""
+        if offset == 0 and limit <= LEADERBOARD_PAGE_SIZE and self._top_cache is not None:
+            return list(self._top_cache[:limit])
+        rows = []
+        if offset < len(self._balances):
+            remaining = offset + 1
+            node = self._head
+            for i in reversed(range(self.MAX_LEVELS)):
+                while node.width[i] <= remaining:
+                    remaining -= node.width[i]
+                    node = node.next[i]
+            while node is not _NIL and len(rows) < limit:
+                neg_balance, user_id = node.key
+                rows.append((user_id, -neg_balance))
+                node = node.next[0]
+        if offset == 0 and limit == LEADERBOARD_PAGE_SIZE:
+            self._top_cache = tuple(rows)
+        return rows
+
+class Ledger:
+    """Append-only file of fixed-width LEDGER_RECORD entries, one per settled round.
+
+    Readers memory-map the file and unpack it a chunk at a time, so the
+    aggregations below run in constant memory however long the ledger gets.
+    A torn record at the end (crash mid-append) is ignored.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+
+    def append(self, user_id: int, game: str, delta: int):
+        if self._file is None:
+            self._file = open(self.path, 'ab')
+        self._file.write(LEDGER_RECORD.pack(user_id, delta, int(time.time()), GAME_CODES.get(game, 0)))
+        self._file.flush()
+
+    def records(self):
+        """Yield (user_id, delta, timestamp, game code) tuples, oldest first"""
+        try:
+            f = open(self.path, 'rb')
+        except FileNotFoundError:
+            return
+        with f:
+            size = os.fstat(f.fileno()).st_size // LEDGER_RECORD.size * LEDGER_RECORD.size
+            if not size:
+                return
+            chunk_size = LEDGER_RECORD.size * LEDGER_SCAN_RECORDS
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                for start in range(0, size, chunk_size):
+                    # Slicing copies one chunk; the mapping itself is never read whole
+                    yield from LEDGER_RECORD.iter_unpack(mm[start:min(start + chunk_size, size)])
+
+    def game_totals(self):
+        """Per game: rounds played, total won and lost by players, and the house's profit"""
+        totals = {}
+        for _, delta, _, game in self.records():
+            entry = totals.setdefault(game, [0, 0, 0])
+            entry[0] += 1
+            if delta > 0:
+                entry[1] += delta
+            else:
+                entry[2] -= delta
+        return {
+            GAME_NAMES.get(game, "other"): {"rounds": rounds, "paid_out": won, "taken_in": lost, "house_profit": lost - won}
+            for game, (rounds, won, lost) in totals.items()
+        }
+
+    def user_stats(self, user_id: int):
+        """Per game for one player: rounds, wins, losses, pushes and net profit"""
+        stats = {}
+        for record_user, delta, _, game in self.records():
+            if record_user != user_id:
+                continue
+            entry = stats.setdefault(GAME_NAMES.get(game, "other"), {"rounds": 0, "wins": 0, "losses": 0, "pushes": 0, "profit": 0})
+            entry["rounds"] += 1
+            entry["profit"] += delta
+            if delta > 0:
+                entry["wins"] += 1
+            elif delta < 0:
+                entry["losses"] += 1
+            else:
+                entry["pushes"] += 1
+        return stats
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+# Round IDs are unique across every store, so a stale ID can never settle a
+# round in a partition that was closed and reopened.
+_round_ids = itertools.count(1)
+
+# Rank index builds run with the cyclic GC paused. A build allocates millions
+# of nodes, and every collection triggered meanwhile would walk all of them
+# while holding the GIL, stalling the event loop for up to a second. The
+# finished nodes are frozen, so later full collections skip them too; they
+# form no cycles, so reference counting still frees a replaced index.
+_gc_pause_lock = threading.Lock()
+_gc_pauses = 0
+_gc_was_enabled = True
+
+@contextmanager
+def _gc_paused():
+    global _gc_pauses, _gc_was_enabled
+    with _gc_pause_lock:
+        if _gc_pauses == 0:
+            _gc_was_enabled = gc.isenabled()
+            gc.disable()
+        _gc_pauses += 1
+    try:
+        yield
+    finally:
+        with _gc_pause_lock:
+            _gc_pauses -= 1
+            if _gc_pauses == 0:
+                gc.freeze()
+                if _gc_was_enabled:
+                    gc.enable()
+
+class BalanceStore:
+    """Player balances in an embedded SQLite database.
+
+    The connection is owned by a single worker thread, so every query runs off
+    the event loop and statements never interleave.
+    """
+
+    def __init__(self, path: str, ledger_path: str = LEDGER_FILE, executor=None, migrate_legacy=False):
+        self.path = path
+        self._owns_executor = executor is None
+        self._executor = executor or ThreadPoolExecutor(max_workers=1, thread_name_prefix="economy-db")
+        self._migrate = migrate_legacy
+        self._conn = None
+        # The rank index holds every player in memory (roughly 0.5 GB per
+        # million), so it is built on a thread of its own after the database
+        # opens. Until it is ready, ranks is None, leaderboard queries go to
+        # SQLite, and _rank_dirty collects players whose balance changed.
+        self.ranks = None
+        self._rank_dirty = set()
+        self._rank_generation = 0
+        self.ledger = Ledger(ledger_path)
+        # Stakes of game rounds in progress. They are only held in memory;
+        # the balance is written once, when the round settles.
+        self._rounds = {}
+        self._held = {}
+
+    @property
+    def idle(self):
+        """True when no round is in progress, so the store can be closed safely"""
+        return not self._rounds
+
+    async def run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            # Autocommit mode; multi-statement writes use explicit transactions
+            conn = sqlite3.connect(self.path, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS balances ("
+                "user_id INTEGER PRIMARY KEY, balance INTEGER NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_balances_balance ON balances(balance)")
+            self._conn = conn
+            if self._migrate:
+                self._migrate_legacy()
+            self.reload_ranks()
+        return self._conn
+
+    def reload_ranks(self):
+        """Rebuild the rank index from the database in the background"""
+        self.ranks = None
+        self._rank_dirty = set()
+        self._rank_generation += 1
+        threading.Thread(target=self._build_ranks, args=(self._rank_generation,), name="economy-ranks", daemon=True).start()
+
+    def _build_ranks(self, generation):
+        # Runs on its own connection, so the worker thread keeps serving calls.
+        # WAL gives it a snapshot; anything written after that is in _rank_dirty.
+        ranks = RankIndex()
+        conn = sqlite3.connect(self.path)
+        try:
+            with _gc_paused():
+                ranks.build(conn.execute("SELECT user_id, balance FROM balances ORDER BY balance DESC, user_id"))
+        except sqlite3.Error as e:
+            print(f"Failed to build the rank index for {self.path}: {e}", flush=True)
+            return
+        finally:
+            conn.close()
+        try:
+            self._executor.submit(self._install_ranks, ranks, generation)
+        except RuntimeError:
+            pass  # the store was closed meanwhile
+
+    def _install_ranks(self, ranks, generation):
+        # On the worker thread, so no balance can change halfway through
+        if generation != self._rank_generation or self._conn is None:
+            return
+        for user_id in self._rank_dirty:
+            row = self._conn.execute("SELECT balance FROM balances WHERE user_id = ?", (user_id,)).fetchone()
+            if row is not None:
+                ranks.set(user_id, row[0])
+        self.ranks = ranks
+        self._rank_dirty = None
+
+    def _migrate_legacy(self):
+        """One-shot import of player_balances.json (and its journal)"""
+        if not os.path.exists(CURRENCY_FILE) and not os.path.exists(JOURNAL_FILE):
+            return
+        balances = load_legacy_balances()
+        rows = []
+        for user_id_str, balance in balances.items():
+            try:
+                rows.append((int(user_id_str), int(balance)))
+            except (TypeError, ValueError):
+                continue
+        with self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO balances (user_id, balance) VALUES (?, ?)", rows
+            )
+        for path in (CURRENCY_FILE, JOURNAL_FILE + ".1", JOURNAL_FILE):
+            if os.path.exists(path):
+                os.replace(path, path + ".migrated")
+        print(f"Migrated {len(rows)} balances from {CURRENCY_FILE} to {self.path}", flush=True)
+
+    def balance_of(self, user_id: int) -> int:
+        # Players without a row read as the starting balance; the row is only
+        # written by their first real change.
+        row = self.conn.execute("SELECT balance FROM balances WHERE user_id = ?", (user_id,)).fetchone()
+        return row[0] if row else STARTING_BALANCE
+
+    @contextmanager
+    def _transaction(self):
+        """Run statements in a transaction, or join the one already open"""
+        conn = self.conn
+        if conn.in_transaction:
+            yield conn
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+
+    def add(self, user_id: int, amount: int) -> int:
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO balances (user_id, balance) VALUES (?, ?) "
+                "ON CONFLICT(user_id) DO UPDATE SET balance = balance + ?",
+                (user_id, STARTING_BALANCE + amount, amount),
+            )
+            balance = conn.execute("SELECT balance FROM balances WHERE user_id = ?", (user_id,)).fetchone()[0]
+        if self.ranks is None:
+            self._rank_dirty.add(user_id)
+        else:
+            self.ranks.set(user_id, balance)
+        return balance
+
+    def available(self, user_id: int) -> int:
+        return self.balance_of(user_id) - self._held.get(user_id, 0)
+
+    def try_hold(self, user_id: int, amount: int):
+        if self.available(user_id) < amount:
+            return None
+        round_id = next(_round_ids)
+        self._rounds[round_id] = (user_id, amount, time.monotonic())
+        self._held[user_id] = self._held.get(user_id, 0) + amount
+        return round_id
+
+    def release(self, round_id: int):
+        """Drop a round's stake without settling it; returns (user_id, stake) or None"""
+        entry = self._rounds.pop(round_id, None)
+        if entry is None:
+            return None
+        user_id, stake, _ = entry
+        held = self._held[user_id] - stake
+        if held:
+            self._held[user_id] = held
+        else:
+            del self._held[user_id]
+        return user_id, stake
+
+    def expire_rounds(self, max_age: float) -> int:
+        """Release rounds held longer than `max_age` seconds; returns how many"""
+        cutoff = time.monotonic() - max_age
+        expired = [round_id for round_id, (_, _, started) in self._rounds.items() if started < cutoff]
+        for round_id in expired:
+            self.release(round_id)
+        return len(expired)
+
+    def settle(self, user_id: int, round_id: int, payout: int, game=None):
+        entry = self._rounds.get(round_id)
+        if entry is None or entry[0] != user_id:
+            return None
+        stake = self.release(round_id)[1]
+        if payout == stake:
+            balance = self.balance_of(user_id)
+        else:
+            balance = self.add(user_id, payout - stake)
+        if game is not None:
+            self.ledger.append(user_id, game, payout - stake)
+        return balance
+
+    def game_totals(self):
+        return self.ledger.game_totals()
+
+    def user_stats(self, user_id: int):
+        return self.ledger.user_stats(user_id)
+
+    def page(self, offset: int, limit: int):
+        conn = self.conn  # opens the database and starts building the rank index
+        if self.ranks is not None:
+            return self.ranks.page(offset, limit)
+        return conn.execute(
+            "SELECT user_id, balance FROM balances ORDER BY balance DESC, user_id LIMIT ? OFFSET ?",
+            (limit, offset),
+        ).fetchall()
+
+    def rank(self, user_id: int):
+        conn = self.conn  # opens the database and starts building the rank index
+        if self.ranks is not None:
+            return self.ranks.rank(user_id), self.ranks.balance(user_id), len(self.ranks)
+        total = conn.execute("SELECT COUNT(*) FROM balances").fetchone()[0]
+        row = conn.execute("SELECT balance FROM balances WHERE user_id = ?", (user_id,)).fetchone()
+        if row is None:
+            return None, None, total
+        ahead = conn.execute(
+            "SELECT (SELECT COUNT(*) FROM balances WHERE balance > ?)"
+            " + (SELECT COUNT(*) FROM balances WHERE balance = ? AND user_id < ?)",
+            (row[0], row[0], user_id),
+        ).fetchone()[0]
+        return ahead + 1, row[0], total
+
+    def run_batch(self, calls):
+        """Execute many (op, args) calls in one transaction.
+
+        Each call gets its own savepoint, so one failing call doesn't undo the
+        others. Returns a list of (ok, result or error message).
+        """
+        results = []
+        with self._transaction() as conn:
+            for op, args in calls:
+                if op not in BALANCE_OPS:
+                    results.append((False, f"Unknown operation: {op}"))
+                    continue
+                conn.execute("SAVEPOINT balance_op")
+                try:
+                    results.append((True, getattr(self, op)(*args)))
+                except Exception as e:
+                    conn.execute("ROLLBACK TO balance_op")
+                    results.append((False, str(e)))
+                conn.execute("RELEASE balance_op")
+        return results
+
+    def close(self):
+        self.ledger.close()
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    async def aclose(self):
+        await self.run(self.close)
+        if self._owns_executor:
+            self._executor.shutdown(wait=False)
+
+class BalancePartitions:
+    """The set of open BalanceStores.
+
+    With ECONOMY_PER_GUILD every guild gets its own database and ledger under
+    ECONOMY_PARTITION_DIR; otherwise everything lives in one global store.
+    Stores open on first use, share a single worker thread, and are closed
+    after PARTITION_IDLE_MINUTES without use, so memory follows the guilds
+    that are actually playing.
+    """
+
+    def __init__(self):
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="economy-db")
+        self._stores = {}
+        self._last_used = {}
+
+    def store(self, guild_id=None) -> BalanceStore:
+        key = int(guild_id) if ECONOMY_PER_GUILD and guild_id else None
+        store = self._stores.get(key)
+        if store is None:
+            if key is None:
+                store = BalanceStore(BALANCE_DB_FILE, LEDGER_FILE, self._executor, migrate_legacy=True)
+            else:
+                base = os.path.join(ECONOMY_PARTITION_DIR, str(key))
+                store = BalanceStore(base + ".db", base + ".ledger.bin", self._executor)
+            self._stores[key] = store
+        self._last_used[key] = time.monotonic()
+        return store
+
+    async def run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    def run_batches(self, groups):
+        """Run [(store, calls)] on the worker thread, one transaction per store"""
+        results = []
+        for store, calls in groups:
+            try:
+                results.append(store.run_batch(calls))
+            except Exception as e:
+                print(f"Balance batch failed for {store.path}: {e}", flush=True)
+                # Whatever was applied in memory may not match the database now
+                store.reload_ranks()
+                results.append([(False, str(e))] * len(calls))
+        return results
+
+    def _expire_rounds(self):
+        for store in list(self._stores.values()):
+            expired = store.expire_rounds(ROUND_HOLD_TTL_MINUTES * 60)
+            if expired:
+                print(f"Released {expired} unsettled round stake(s) in {store.path}", flush=True)
+
+    async def evict_idle(self):
+        await self.run(self._expire_rounds)
+        cutoff = time.monotonic() - PARTITION_IDLE_MINUTES * 60
+        for key in [key for key, used in self._last_used.items() if used < cutoff]:
+            store = self._stores.get(key)
+            # Re-check: the store may have been used while we were closing another
+            if store is None or self._last_used[key] >= cutoff or not store.idle:
+                continue
+            del self._stores[key], self._last_used[key]
+            await self.run(store.close)
+
+    async def aclose(self):
+        stores, self._stores = list(self._stores.values()), {}
+        self._last_used.clear()
+        for store in stores:
+            await self.run(store.close)
+        self._executor.shutdown(wait=False)
+
+# Store operations that may be invoked through a balance backend
+BALANCE_OPS = frozenset({"balance_of", "available", "add", "try_hold", "settle", "page", "rank"})
+# Ledger scans only read an append-only file, so they run outside the store's
+# worker thread and never hold up balance changes.
+LEDGER_OPS = frozenset({"game_totals", "user_stats"})
+
+def parse_server_address(address):
+    """Split "unix:/path" or "tcp:host:port" into (kind, target)"""
+    kind, _, rest = address.partition(":")
+    if kind == "unix" and rest:
+        return kind, rest
+    if kind == "tcp":
+        host, _, port = rest.rpartition(":")
+        return kind, (host or "127.0.0.1", int(port))
+    raise ValueError(f"Unsupported economy server address: {address!r}")
+
+class LocalBalances:
+    """Balance backend for a single bot process: the stores live in-process"""
+
+    def __init__(self, partitions: BalancePartitions):
+        self.partitions = partitions
+
+    async def call(self, op, *args, guild_id=None):
+        store = self.partitions.store(guild_id)
+        if op in LEDGER_OPS:
+            return await asyncio.to_thread(getattr(store, op), *args)
+        return await self.partitions.run(getattr(store, op), *args)
+
+    async def evict_idle(self):
+        await self.partitions.evict_idle()
+
+    async def aclose(self):
+        await self.partitions.aclose()
+
+class BalanceServer:
+    """Serves the balance stores to any number of bot processes.
+
+    The protocol is one JSON object per line: {"id", "op", "args", "guild"} in
+    and {"id", "result"} or {"id", "error"} out. Requests from every connection
+    are queued and executed together, one worker hop and one SQLite transaction
+    per store per batch, with replies written back in a single flush per
+    connection.
+    """
+
+    def __init__(self, partitions: BalancePartitions, address: str):
+        self.partitions = partitions
+        self.address = address
+        self._pending = []
+        self._wakeup = asyncio.Event()
+        # writer -> {round_id: store} for rounds held by that connection, so a
+        # client that goes away doesn't leave its players' stakes reserved
+        self._holds = {}
+
+    async def serve_forever(self):
+        kind, target = parse_server_address(self.address)
+        if kind == "unix":
+            if os.path.exists(target):
+                os.remove(target)
+            server = await asyncio.start_unix_server(self._handle_connection, path=target)
+        else:
+            server = await asyncio.start_server(self._handle_connection, *target)
+        batcher = asyncio.create_task(self._run_batches())
+        evictor = asyncio.create_task(self._evict_idle_partitions())
+        print(f"Balance server listening on {self.address}", flush=True)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            batcher.cancel()
+            evictor.cancel()
+            await self.partitions.aclose()
+
+    async def _evict_idle_partitions(self):
+        while True:
+            await asyncio.sleep(60)
+            await self.partitions.evict_idle()
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while line := await reader.readline():
+                try:
+                    request = json.loads(line)
+                    request_id = request["id"]
+                except (ValueError, KeyError, TypeError):
+                    # Nothing to reply to; the client's call times out
+                    continue
+                # Anything wrong past this point gets an error reply, so the client isn't left waiting
+                try:
+                    op, args = request["op"], request.get("args", [])
+                    if not isinstance(args, list):
+                        raise TypeError("args must be a list")
+                    store = self.partitions.store(request.get("guild"))
+                except (ValueError, KeyError, TypeError, OSError) as e:
+                    self._send_error(writer, request_id, f"Bad request: {e!r}")
+                    continue
+                if op in LEDGER_OPS:
+                    asyncio.create_task(self._answer_ledger(writer, request_id, store, op, args))
+                    continue
+                self._pending.append((writer, request_id, store, op, args))
+                self._wakeup.set()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+            await self._release_holds(self._holds.pop(writer, {}))
+
+    async def _release_holds(self, holds):
+        if holds:
+            await self.partitions.run(lambda: [store.release(round_id) for round_id, store in holds.items()])
+            print(f"Released {len(holds)} stake(s) held by a closed connection", flush=True)
+
+    def _send_error(self, writer, request_id, error):
+        if not writer.is_closing():
+            writer.write((json.dumps({"id": request_id, "error": error}) + "\n").encode())
+
+    async def _answer_ledger(self, writer, request_id, store, op, args):
+        try:
+            reply = {"id": request_id, "result": await asyncio.to_thread(getattr(store, op), *args)}
+        except Exception as e:
+            reply = {"id": request_id, "error": str(e)}
+        if not writer.is_closing():
+            writer.write((json.dumps(reply) + "\n").encode())
+
+    async def _run_batches(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            batch, self._pending = self._pending, []
+            groups = {}
+            for index, (_, _, store, op, args) in enumerate(batch):
+                groups.setdefault(store, []).append((index, op, args))
+            group_results = await self.partitions.run(
+                self.partitions.run_batches,
+                [(store, [(op, args) for _, op, args in calls]) for store, calls in groups.items()],
+            )
+            results = [None] * len(batch)
+            for calls, outcomes in zip(groups.values(), group_results):
+                for (index, _, _), outcome in zip(calls, outcomes):
+                    results[index] = outcome
+
+            writers = set()
+            orphaned = {}
+            for (writer, request_id, store, op, args), (ok, value) in zip(batch, results):
+                if ok and op == "try_hold" and value is not None:
+                    if writer.is_closing():
+                        orphaned[value] = store
+                    else:
+                        self._holds.setdefault(writer, {})[value] = store
+                elif ok and op == "settle" and writer in self._holds:
+                    self._holds[writer].pop(args[1], None)
+                if writer.is_closing():
+                    continue
+                reply = {"id": request_id, "result": value} if ok else {"id": request_id, "error": value}
+                writer.write((json.dumps(reply) + "\n").encode())
+                writers.add(writer)
+            for writer in writers:
+                try:
+                    await writer.drain()
+                except ConnectionError:
+                    pass
+            await self._release_holds(orphaned)
+
+class EconomyUnavailable(ConnectionError):
+    """The economy server couldn't be reached or didn't answer in time"""
+
+class BalanceClient:
+    """Balance backend that forwards every call to a BalanceServer.
+
+    One connection is opened lazily and reused. Calls are pipelined: each is
+    written as soon as it is made and replies are matched back by request ID.
+    """
+
+    def __init__(self, address: str):
+        self.address = address
+        self._writer = None
+        self._connect_lock = asyncio.Lock()
+        self._pending = {}
+        self._next_id = 0
+
+    async def _connect(self):
+        async with self._connect_lock:
+            if self._writer is not None:
+                return self._writer
+            kind, target = parse_server_address(self.address)
+            try:
+                if kind == "unix":
+                    reader, writer = await asyncio.open_unix_connection(target)
+                else:
+                    reader, writer = await asyncio.open_connection(*target)
+            except OSError as e:
+                raise EconomyUnavailable(f"Can't reach the economy server at {self.address}: {e}") from e
+            self._writer = writer
+            asyncio.create_task(self._read_replies(reader, writer))
+            return writer
+
+    async def _read_replies(self, reader, writer):
+        try:
+            while line := await reader.readline():
+                reply = json.loads(line)
+                future = self._pending.pop(reply["id"], None)
+                if future is None or future.done():
+                    continue
+                if "error" in reply:
+                    future.set_exception(RuntimeError(f"Economy server error: {reply['error']}"))
+                else:
+                    future.set_result(reply["result"])
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            if self._writer is writer:
+                self._writer = None
+            writer.close()
+            pending, self._pending = self._pending, {}
+            for future in pending.values():
+                if not future.done():
+                    future.set_exception(EconomyUnavailable("Lost connection to the economy server"))
+
+    async def call(self, op, *args, guild_id=None):
+        writer = self._writer or await self._connect()
+        self._next_id += 1
+        request_id = self._next_id
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        request = {"id": request_id, "op": op, "args": args, "guild": guild_id}
+        writer.write((json.dumps(request) + "\n").encode())
+        if writer.transport.get_write_buffer_size() > 65536:
+            await writer.drain()
+        try:
+            return await asyncio.wait_for(future, ECONOMY_CALL_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            self._pending.pop(request_id, None)
+            raise EconomyUnavailable(f"Economy server didn't answer {op} within {ECONOMY_CALL_TIMEOUT_SECONDS}s")
+
+    async def evict_idle(self):
+        # The server manages its own partitions
+        pass
+
+    async def aclose(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+_backend = BalanceClient(ECONOMY_SERVER) if ECONOMY_SERVER else LocalBalances(BalancePartitions())
+
+# Striped per-user locks: a user always maps to the same lock, and unrelated
+# users only share one when their IDs collide modulo LOCK_STRIPES.
+_user_locks = [asyncio.Lock() for _ in range(LOCK_STRIPES)]
+
+def _user_lock(user_id):
+    return _user_locks[int(user_id) % LOCK_STRIPES]
+
+# Every call takes the guild it was made from. It selects that guild's
+# economy when ECONOMY_PER_GUILD is on and is ignored otherwise.
+
+async def get_balance(user_id, guild_id=None):
+    """Get player's balance; new players read as STARTING_BALANCE without a write"""
+    return await _backend.call("balance_of", int(user_id), guild_id=guild_id)
+
+async def update_balance(user_id, amount, guild_id=None):
     """Update player's balance"""
-    balances = load_balances()
-    user_id_str = str(user_id)
-    if user_id_str not in balances:
-        balances[user_id_str] = STARTING_BALANCE
-    balances[user_id_str] += amount
-    save_balances(balances)
-    return balances[user_id_str]
-
-def can_afford(user_id, amount):
-    """Check if player can afford the amount"""
-    return get_balance(user_id) >= amount
+    return await _backend.call("add", int(user_id), int(amount), guild_id=guild_id)
+
+async def can_afford(user_id, amount, guild_id=None):
+    """Check if player can afford the amount, not counting stakes already in play"""
+    return await _backend.call("available", int(user_id), guild_id=guild_id) >= amount
+
+async def try_debit(user_id, amount, guild_id=None):
+    """Reserve `amount` of a player's balance as the stake for a game round.
+
+    Returns a round ID to pass to settle_round, or None if the player can't
+    afford it. Nothing is written until the round settles.
+    """
+    async with _user_lock(user_id):
+        return await _backend.call("try_hold", int(user_id), int(amount), guild_id=guild_id)
+
+async def settle_round(user_id, round_id, payout=0, game=None, guild_id=None):
+    """Release a round's stake and credit `payout` in a single balance write.
+
+    Rounds settled with a `game` name are also recorded in the ledger.
+    Returns the new balance, or None if the round was already settled.
+    """
+    async with _user_lock(user_id):
+        return await _backend.call("settle", int(user_id), round_id, int(payout), game, guild_id=guild_id)
+
+async def game_totals(guild_id=None):
+    """Ledger totals per game, keyed by game name"""
+    return await _backend.call("game_totals", guild_id=guild_id)
+
+async def user_game_stats(user_id, guild_id=None):
+    """Ledger stats per game for one player, keyed by game name"""
+    return await _backend.call("user_stats", int(user_id), guild_id=guild_id)
+
+async def top_balances(limit=LEADERBOARD_PAGE_SIZE, offset=0, guild_id=None):
+    """Return (user_id, balance) rows ranked richest first, starting after `offset`"""
+    return await _backend.call("page", offset, limit, guild_id=guild_id)
+
+async def get_rank(user_id, guild_id=None):
+    """Return (rank, balance, total players); rank is None for players without a balance"""
+    return await _backend.call("rank", int(user_id), guild_id=guild_id)
+
+class UserProfileCache:
+    """(name, avatar URL) for players shown on the leaderboard.
+
+    The gateway's user cache is checked first, then our own TTL cache, and only
+    the remaining misses go to the REST API, a few at a time and concurrently.
+    """
+
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self._entries = {}
+        self._fetch_limit = asyncio.Semaphore(USER_FETCH_CONCURRENCY)
+
+    def _remember(self, user_id, user):
+        if len(self._entries) >= USER_CACHE_MAX_ENTRIES:
+            now = time.monotonic()
+            self._entries = {uid: entry for uid, entry in self._entries.items() if entry[0] > now}
+            while len(self._entries) >= USER_CACHE_MAX_ENTRIES:
+                # Dicts keep insertion order, so this drops the oldest entry
+                del self._entries[next(iter(self._entries))]
+        profile = (user.name, user.display_avatar.url)
+        self._entries[user_id] = (time.monotonic() + USER_CACHE_TTL_SECONDS, *profile)
+        return profile
+
+    def get_cached(self, user_id):
+        user = self.bot.get_user(user_id)
+        if user is not None:
+            return user.name, user.display_avatar.url
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del self._entries[user_id]
+            return None
+        return entry[1], entry[2]
+
+    async def _fetch(self, user_id):
+        async with self._fetch_limit:
+            try:
+                user = await self.bot.fetch_user(user_id)
+            except discord.HTTPException:
+                return None
+        return self._remember(user_id, user)
+
+    async def resolve(self, user_ids):
+        """Map each user ID to (name, avatar URL), or None if it can't be fetched"""
+        profiles = {user_id: self.get_cached(user_id) for user_id in user_ids}
+        misses = [user_id for user_id, profile in profiles.items() if profile is None]
+        if misses:
+            fetched = await asyncio.gather(*(self._fetch(user_id) for user_id in misses))
+            profiles.update(zip(misses, fetched))
+        return profiles
 
 class Economy(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
+        self.profiles = UserProfileCache(bot)
+        self.evict_idle_economies.start()
+
+    async def cog_unload(self):
+        self.evict_idle_economies.cancel()
+        await _backend.aclose()
+
+    @tasks.loop(minutes=1)
+    async def evict_idle_economies(self):
+        await _backend.evict_idle()
 
     @app_commands.command(name="balance", description="Check your current balance")
     async def balance(self, interaction: discord.Interaction):
-        user_balance = get_balance(interaction.user.id)
+        user_balance = await get_balance(interaction.user.id, interaction.guild_id)
 
         embed = discord.Embed(
             title="💰 Your Balance",
@@ -95,18 +1057,30 @@ class Economy(commands.Cog):
         await interaction.response.send_message(embed=embed)
 
     @app_commands.command(name="leaderboard", description="View the top players by total balance")
-    async def leaderboard(self, interaction: discord.Interaction):
-        balances = load_balances()
-        if not balances:
-            await interaction.response.send_message("No player data yet!", ephemeral=True)
+    @app_commands.describe(page="Page of the rankings to show (10 players per page)")
+    async def leaderboard(self, interaction: discord.Interaction, page: app_commands.Range[int, 1, 100000] = 1):
+        offset = (page - 1) * LEADERBOARD_PAGE_SIZE
+        sorted_players = await top_balances(LEADERBOARD_PAGE_SIZE, offset, interaction.guild_id)
+        if not sorted_players:
+            message = "No player data yet!" if page == 1 else f"There is no page {page}."
+            await interaction.response.send_message(message, ephemeral=True)
             return
 
-        # Sort by balance descending
-        sorted_players = sorted(balances.items(), key=lambda x: x[1], reverse=True)[:10]
+        user_ids = [user_id for user_id, _ in sorted_players]
+        profiles = {user_id: self.profiles.get_cached(user_id) for user_id in user_ids}
+        deferred = None in profiles.values()
+        if deferred:
+            # Some names need REST lookups; don't let them eat the 3 second deadline
+            await interaction.response.defer()
+            profiles = await self.profiles.resolve(user_ids)
 
+        if page == 1:
+            subtitle = f"Top {LEADERBOARD_PAGE_SIZE} richest players across all games"
+        else:
+            subtitle = f"Ranks {offset + 1:,}–{offset + len(sorted_players):,} across all games"
         embed = discord.Embed(
             title=" Casino Leaderboard",
-            description="Top 10 richest players across all games",
+            description=subtitle,
             color=discord.Color.gold(),
             timestamp=datetime.now(timezone.utc)
         )
@@ -115,25 +1089,87 @@ class Economy(commands.Cog):
         rank_emojis = ["🥇", "🥈", "🥉"] + ["🏅"] * 7
 
         for i, (user_id, balance) in enumerate(sorted_players):
-            try:
-                user = await self.bot.fetch_user(int(user_id))
-                net_gain = balance - STARTING_BALANCE
-                emoji = rank_emojis[i] if i < len(rank_emojis) else "🏅"
-                sign = "+" if net_gain >= 0 else ""
-                leaderboard_text += f"{emoji} **{user.name}** — 💰 ${balance:,}  (`{sign}{net_gain:,}`)\n"
-            except Exception:
-                pass
-
-        embed.description = leaderboard_text or "No data yet!"
-        embed.set_footer(text=f"Requested by {interaction.user}", icon_url=interaction.user.display_avatar.url)
+            profile = profiles.get(user_id)
+            if profile is None:
+                continue
+            net_gain = balance - STARTING_BALANCE
+            rank = offset + i
+            emoji = rank_emojis[rank] if rank < len(rank_emojis) else f"`#{rank + 1}`"
+            sign = "+" if net_gain >= 0 else ""
+            leaderboard_text += f"{emoji} **{profile[0]}** — 💰 ${balance:,}  (`{sign}{net_gain:,}`)\n"
 
-        try:
-            top_user = await self.bot.fetch_user(int(sorted_players[0][0]))
-            embed.set_thumbnail(url=top_user.display_avatar.url)
-        except Exception:
-            pass
+        embed.description = f"{subtitle}\n\n{leaderboard_text}" if leaderboard_text else "No data yet!"
+        embed.set_footer(text=f"Page {page} • Requested by {interaction.user}", icon_url=interaction.user.display_avatar.url)
+
+        top_profile = profiles.get(user_ids[0])
+        if top_profile is not None:
+            embed.set_thumbnail(url=top_profile[1])
+
+        if deferred:
+            await interaction.followup.send(embed=embed)
+        else:
+            await interaction.response.send_message(embed=embed)
+
+    @app_commands.command(name="rank", description="See where you (or another player) rank on the leaderboard")
+    @app_commands.describe(member="Player to look up")
+    async def rank(self, interaction: discord.Interaction, member: Optional[discord.User] = None):
+        target = member or interaction.user
+        rank, balance, total = await get_rank(target.id, interaction.guild_id)
+        if rank is None:
+            who = "You haven't" if target == interaction.user else f"{target.display_name} hasn't"
+            await interaction.response.send_message(f"{who} played yet, so there is no rank.", ephemeral=True)
+            return
 
+        page = (rank - 1) // LEADERBOARD_PAGE_SIZE + 1
+        embed = discord.Embed(
+            title="📊 Leaderboard Rank",
+            description=f"{target.mention} is ranked **#{rank:,}** of {total:,} players",
+            color=discord.Color.gold(),
+            timestamp=datetime.now(timezone.utc)
+        )
+        embed.add_field(name="💵 Balance", value=f"**${balance:,}**", inline=True)
+        embed.add_field(name="📄 Leaderboard Page", value=f"`/leaderboard page:{page}`", inline=True)
+        embed.set_footer(text=f"Requested by {interaction.user}", icon_url=interaction.user.display_avatar.url)
         await interaction.response.send_message(embed=embed)
 
+    @app_commands.command(name="casino_stats", description="Game history from the casino ledger")
+    @app_commands.describe(member="Show one player's history instead of the house totals")
+    async def casino_stats(self, interaction: discord.Interaction, member: Optional[discord.User] = None):
+        await interaction.response.defer()
+        embed = discord.Embed(color=discord.Color.gold(), timestamp=datetime.now(timezone.utc))
+
+        if member is None:
+            embed.title = "🎰 Casino Stats"
+            for game, totals in sorted((await game_totals(interaction.guild_id)).items()):
+                embed.add_field(
+                    name=game.capitalize(),
+                    value=(
+                        f"Rounds: **{totals['rounds']:,}**\n"
+                        f"Paid out: **${totals['paid_out']:,}**\n"
+                        f"Taken in: **${totals['taken_in']:,}**\n"
+                        f"House profit: **${totals['house_profit']:,}**"
+                    ),
+                    inline=True
+                )
+        else:
+            embed.title = f"🎰 Casino Stats — {member.display_name}"
+            embed.set_thumbnail(url=member.display_avatar.url)
+            for game, stats in sorted((await user_game_stats(member.id, interaction.guild_id)).items()):
+                sign = "+" if stats["profit"] >= 0 else ""
+                embed.add_field(
+                    name=game.capitalize(),
+                    value=(
+                        f"Rounds: **{stats['rounds']:,}**\n"
+                        f"W/L/P: **{stats['wins']:,}/{stats['losses']:,}/{stats['pushes']:,}**\n"
+                        f"Profit: **{sign}${stats['profit']:,}**"
+                    ),
+                    inline=True
+                )
+
+        if not embed.fields:
+            embed.description = "No games recorded yet!"
+        embed.set_footer(text=f"Requested by {interaction.user}", icon_url=interaction.user.display_avatar.url)
+        await interaction.followup.send(embed=embed)
+
 async def setup(bot: commands.Bot):
     await bot.add_cog(Economy(bot))
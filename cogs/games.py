@@ -4,7 +4,25 @@ from discord.ext import commands
 from discord.ui import Button, View
 import random
 from datetime import datetime, timezone
-from cogs.economy import get_balance, update_balance, can_afford
+from cogs.economy import get_balance, try_debit, settle_round, EconomyUnavailable
+
+# settle_round returns None when the round's stake is no longer held (e.g. the
+# economy restarted mid-game); nothing was paid out and nothing was taken
+ROUND_EXPIRED_MESSAGE = "⚠️ **This round expired before it could be settled.** Nothing was paid out, and your bet wasn't taken."
+# The economy server didn't confirm a settle. It may still have gone through;
+# if not, the economy releases the stake once the hold times out
+ROUND_UNCONFIRMED_MESSAGE = "⚠️ **The bank didn't confirm this round.** If it went through it'll show in your balance; otherwise your bet is returned automatically."
+BANK_UNAVAILABLE_MESSAGE = "❌ The bank isn't responding right now. Try again in a moment!"
+
+async def settle_or_note(user_id, round_id, payout=0, game=None, guild_id=None):
+    """Settle a round; returns a message to show instead of the result if it didn't settle"""
+    try:
+        if await settle_round(user_id, round_id, payout, game, guild_id=guild_id) is None:
+            return ROUND_EXPIRED_MESSAGE
+    except EconomyUnavailable as e:
+        print(f"Couldn't settle round {round_id} for {user_id}: {e}", flush=True)
+        return ROUND_UNCONFIRMED_MESSAGE
+    return None
 
 # --- Wordle Game Logic ---
 class WordleGame:
@@ -160,11 +178,13 @@ class WordleGame:
 
 # --- Blackjack Game Logic ---
 class BlackjackGame:
-    def __init__(self, bet_amount=0):
+    def __init__(self, bet_amount=0, round_id=None, guild_id=None):
         self.deck = []
         self.player_hand = []
         self.dealer_hand = []
         self.bet_amount = bet_amount
+        self.round_id = round_id
+        self.guild_id = guild_id
         self.reset_deck()
 
     def reset_deck(self):
@@ -222,10 +242,18 @@ class BlackjackView(View):
         if self.game_over: self.clear_items()
         await interaction.response.edit_message(embed=embed, view=self)
 
+    async def on_timeout(self):
+        # An abandoned hand forfeits the stake
+        if not self.game_over:
+            self.game_over = True
+            await settle_or_note(self.user_id, self.game.round_id, 0, "blackjack", guild_id=self.game.guild_id)
+
     @discord.ui.button(label="Hit", style=discord.ButtonStyle.primary, emoji="👊")
     async def hit_button(self, interaction: discord.Interaction, button: Button):
         if interaction.user.id != self.user_id:
             return await interaction.response.send_message("This isn't your game!", ephemeral=True)
+        if self.game_over:
+            return await interaction.response.send_message("This game is already over!", ephemeral=True)
         self.game.player_hand.append(self.game.deal_card())
         if self.game.calculate_hand(self.game.player_hand) > 21:
             self.game_over = True
@@ -237,31 +265,34 @@ class BlackjackView(View):
     async def stand_button(self, interaction: discord.Interaction, button: Button):
         if interaction.user.id != self.user_id:
             return await interaction.response.send_message("This isn't your game!", ephemeral=True)
+        if self.game_over:
+            return await interaction.response.send_message("This game is already over!", ephemeral=True)
         self.game_over = True
         await self.dealer_play(interaction)
 
     async def dealer_play(self, interaction: discord.Interaction):
         player_total = self.game.calculate_hand(self.game.player_hand)
         if player_total > 21:
-            return await self.update_game(interaction, "💥 **Bust! You went over 21. Dealer wins!**")
+            note = await settle_or_note(self.user_id, self.game.round_id, 0, "blackjack", guild_id=self.game.guild_id)
+            return await self.update_game(interaction, note or "💥 **Bust! You went over 21. Dealer wins!**")
         dealer_total = self.game.calculate_hand(self.game.dealer_hand)
         while dealer_total < 17:
             self.game.dealer_hand.append(self.game.deal_card())
             dealer_total = self.game.calculate_hand(self.game.dealer_hand)
         if dealer_total > 21:
             winnings = self.game.bet_amount * 2
-            update_balance(self.user_id, winnings)
             message = f"🎉 **Dealer busts! You win ${winnings:,}!**"
         elif player_total > dealer_total:
             winnings = self.game.bet_amount * 2
-            update_balance(self.user_id, winnings)
             message = f"🎉 **You win ${winnings:,}!**"
         elif player_total < dealer_total:
+            winnings = 0
             message = f"😔 **Dealer wins! You lost ${self.game.bet_amount:,}**"
         else:
-            update_balance(self.user_id, self.game.bet_amount)
+            winnings = self.game.bet_amount
             message = f"🤝 **It's a tie! Your bet of ${self.game.bet_amount:,} was returned**"
-        await self.update_game(interaction, message)
+        note = await settle_or_note(self.user_id, self.game.round_id, winnings, "blackjack", guild_id=self.game.guild_id)
+        await self.update_game(interaction, note or message)
 
 # --- Wordle UI ---
 class WordleView(View):
@@ -439,8 +470,9 @@ class BaccaratNewRoundButton(Button):
 
 # --- Mines ---
 class MinesGame:
-    def __init__(self, user_id, bet_amount, num_mines):
-        self.user_id, self.bet_amount, self.num_mines = user_id, bet_amount, num_mines
+    def __init__(self, user_id, bet_amount, num_mines, round_id=None, guild_id=None):
+        self.user_id, self.bet_amount, self.num_mines, self.round_id = user_id, bet_amount, num_mines, round_id
+        self.guild_id = guild_id
         self.board_size, self.revealed, self.game_over, self.won, self.multiplier = 20, set(), False, False, 1.0
         self.mine_positions = set(random.sample(range(self.board_size), num_mines))
 
@@ -481,9 +513,9 @@ class MinesButton(Button):
                     item.label, item.style = "💣", discord.ButtonStyle.danger
                 item.disabled = True
             if not is_safe:
-                update_balance(interaction.user.id, -game.bet_amount)
-                await interaction.response.edit_message(embed=discord.Embed(title="💣 BOOM!", description=f"Lost **${game.bet_amount:,}**", color=discord.Color.red()), view=self.view)
-                del mines_games[interaction.user.id]
+                mines_games.pop(interaction.user.id, None)
+                note = await settle_or_note(interaction.user.id, game.round_id, 0, "mines", guild_id=game.guild_id)
+                await interaction.response.edit_message(embed=discord.Embed(title="💣 BOOM!", description=note or f"Lost **${game.bet_amount:,}**", color=discord.Color.red()), view=self.view)
         else:
             potential = int(game.bet_amount * game.multiplier)
             embed = discord.Embed(title="💎 Mines", description=f"Bet: **${game.bet_amount:,}** | Mines: **{game.num_mines}**", color=discord.Color.green())
@@ -499,27 +531,40 @@ class MinesView(View):
         for i in range(20): self.add_item(MinesButton(i, i // 5))
         self.add_item(CashOutButton())
     async def on_timeout(self):
-        if self.game.user_id in mines_games: del mines_games[self.game.user_id]
+        # Unfinished games are refunded, so settling at the stake writes nothing
+        if mines_games.get(self.game.user_id) is self.game:
+            del mines_games[self.game.user_id]
+            await settle_or_note(self.game.user_id, self.game.round_id, self.game.bet_amount, guild_id=self.game.guild_id)
 
 class CashOutButton(Button):
     def __init__(self):
         super().__init__(style=discord.ButtonStyle.success, label="💰 Cash Out", row=4)
     async def callback(self, interaction: discord.Interaction):
         game = mines_games.get(interaction.user.id)
-        if not game: return await interaction.response.send_message("No active game!", ephemeral=True)
+        if not game or game.game_over: return await interaction.response.send_message("No active game!", ephemeral=True)
         if not game.revealed: return await interaction.response.send_message("Reveal at least one tile!", ephemeral=True)
         winnings = game.cash_out()
         profit = winnings - game.bet_amount
-        update_balance(interaction.user.id, profit)
+        del mines_games[interaction.user.id]
+        try:
+            settled = await settle_round(interaction.user.id, game.round_id, winnings, "mines", guild_id=game.guild_id)
+        except EconomyUnavailable:
+            # Keep the game going so the player can cash out again
+            game.game_over = game.won = False
+            mines_games[interaction.user.id] = game
+            return await interaction.response.send_message(BANK_UNAVAILABLE_MESSAGE, ephemeral=True)
         for item in self.view.children: item.disabled = True
+        if settled is None:
+            return await interaction.response.edit_message(embed=discord.Embed(title="💎 Mines", description=ROUND_EXPIRED_MESSAGE, color=discord.Color.orange()), view=self.view)
         embed = discord.Embed(title=" Cashed Out!", description=f"Won **${winnings:,}** (Profit: **${profit:,}**)", color=discord.Color.gold())
         embed.add_field(name="Final Multiplier", value=f"{game.multiplier:.2f}x", inline=True)
         await interaction.response.edit_message(embed=embed, view=self.view)
-        del mines_games[interaction.user.id]
 
 # --- Tower ---
 class TowerGame:
-    def __init__(self, user_id, bet):
+    def __init__(self, user_id, bet, round_id=None, guild_id=None):
+        self.round_id = round_id
+        self.guild_id = guild_id
         self.user_id, self.bet, self.level, self.max_levels, self.multiplier, self.game_over, self.bomb_position = user_id, bet, 1, 10, 1.0, False, None
     def next_level(self):
         self.level += 1
@@ -540,24 +585,32 @@ class TowerButton(Button):
         if not game or game.game_over: return await interaction.response.send_message("No active Tower game!", ephemeral=True)
         if game.is_bomb(self.position):
             game.game_over = True
-            update_balance(interaction.user.id, -game.bet)
+            del tower_games[interaction.user.id]
+            note = await settle_or_note(interaction.user.id, game.round_id, 0, "tower", guild_id=game.guild_id)
             for item in self.view.children:
                 if isinstance(item, TowerButton):
                     item.disabled, item.style = True, discord.ButtonStyle.danger if item.position == game.bomb_position else discord.ButtonStyle.success
-            embed = discord.Embed(title="💣 BOOM!", description=f"Lost **${game.bet:,}**", color=discord.Color.red())
+            embed = discord.Embed(title="💣 BOOM!", description=note or f"Lost **${game.bet:,}**", color=discord.Color.red())
             embed.add_field(name="Progress", value=game.progress_bar(), inline=False)
             await interaction.response.edit_message(embed=embed, view=self.view)
-            del tower_games[interaction.user.id]
         else:
             if game.level >= game.max_levels:
                 winnings = int(game.bet * game.multiplier)
-                update_balance(interaction.user.id, winnings - game.bet)
                 game.game_over = True
+                del tower_games[interaction.user.id]
+                try:
+                    settled = await settle_round(interaction.user.id, game.round_id, winnings, "tower", guild_id=game.guild_id)
+                except EconomyUnavailable:
+                    # Keep the game going so the player can cash out instead
+                    game.game_over = False
+                    tower_games[interaction.user.id] = game
+                    return await interaction.response.send_message(BANK_UNAVAILABLE_MESSAGE, ephemeral=True)
                 for item in self.view.children: item.disabled = True
                 embed = discord.Embed(title=" Conquered the tower!", description=f"Won **${winnings:,}**", color=discord.Color.gold())
+                if settled is None:
+                    embed.description, embed.color = ROUND_EXPIRED_MESSAGE, discord.Color.orange()
                 embed.add_field(name="Progress", value=game.progress_bar(), inline=False)
                 await interaction.response.edit_message(embed=embed, view=self.view)
-                del tower_games[interaction.user.id]
             else:
                 game.next_level()
                 embed = discord.Embed(title=" Tower Game", description=f"Level: **{game.level} / {game.max_levels}**\nMultiplier: **{game.multiplier:.2f}x**", color=discord.Color.blue())
@@ -571,13 +624,21 @@ class CashOutTowerButton(Button):
         game = tower_games.get(interaction.user.id)
         if not game or game.game_over: return await interaction.response.send_message("No active game!", ephemeral=True)
         winnings = int(game.bet * game.multiplier)
-        update_balance(interaction.user.id, winnings - game.bet)
         game.game_over = True
+        del tower_games[interaction.user.id]
+        try:
+            settled = await settle_round(interaction.user.id, game.round_id, winnings, "tower", guild_id=game.guild_id)
+        except EconomyUnavailable:
+            # Keep the game going so the player can cash out again
+            game.game_over = False
+            tower_games[interaction.user.id] = game
+            return await interaction.response.send_message(BANK_UNAVAILABLE_MESSAGE, ephemeral=True)
         for item in self.view.children: item.disabled = True
         embed = discord.Embed(title=" Cashed Out!", description=f"Won **${winnings:,}**", color=discord.Color.gold())
+        if settled is None:
+            embed.description, embed.color = ROUND_EXPIRED_MESSAGE, discord.Color.orange()
         embed.add_field(name="Progress", value=game.progress_bar(), inline=False)
         await interaction.response.edit_message(embed=embed, view=self.view)
-        del tower_games[interaction.user.id]
 
 class TowerView(View):
     def __init__(self, game):
@@ -587,7 +648,10 @@ class TowerView(View):
         for i in range(1, 4): self.add_item(TowerButton(i))
         self.add_item(CashOutTowerButton())
     async def on_timeout(self):
-        if self.game.user_id in tower_games: del tower_games[self.game.user_id]
+        # Unfinished games are refunded, so settling at the stake writes nothing
+        if tower_games.get(self.game.user_id) is self.game:
+            del tower_games[self.game.user_id]
+            await settle_or_note(self.game.user_id, self.game.round_id, self.game.bet, guild_id=self.game.guild_id)
 
 class Games(commands.Cog):
     def __init__(self, bot: commands.Bot):
@@ -598,20 +662,23 @@ class Games(commands.Cog):
     async def blackjack(self, interaction: discord.Interaction, bet: int = 100):
         if bet < 100: return await interaction.response.send_message("❌ Minimum bet is $100!", ephemeral=True)
         if bet > 10000: return await interaction.response.send_message("❌ Maximum bet is $10,000!", ephemeral=True)
-        if not can_afford(interaction.user.id, bet):
-            return await interaction.response.send_message(f"❌ Can't afford! Balance: ${get_balance(interaction.user.id):,}", ephemeral=True)
-        update_balance(interaction.user.id, -bet)
-        game = BlackjackGame(bet_amount=bet)
+        try:
+            round_id = await try_debit(interaction.user.id, bet, interaction.guild_id)
+            if round_id is None:
+                return await interaction.response.send_message(f"❌ Can't afford! Balance: ${await get_balance(interaction.user.id, interaction.guild_id):,}", ephemeral=True)
+        except EconomyUnavailable:
+            return await interaction.response.send_message(BANK_UNAVAILABLE_MESSAGE, ephemeral=True)
+        game = BlackjackGame(bet_amount=bet, round_id=round_id, guild_id=interaction.guild_id)
         game.start_game()
         player_total, dealer_total = game.calculate_hand(game.player_hand), game.calculate_hand(game.dealer_hand)
         if player_total == 21:
             if dealer_total == 21:
-                update_balance(interaction.user.id, game.bet_amount)
-                description = f"🤝 **Push! Both have Blackjack!**"
+                note = await settle_or_note(interaction.user.id, round_id, game.bet_amount, "blackjack", guild_id=interaction.guild_id)
+                description = note or f"🤝 **Push! Both have Blackjack!**"
             else:
                 winnings = int(game.bet_amount * 2.5)
-                update_balance(interaction.user.id, winnings)
-                description = f"🎉 **BLACKJACK! You win ${winnings:,}!**"
+                note = await settle_or_note(interaction.user.id, round_id, winnings, "blackjack", guild_id=interaction.guild_id)
+                description = note or f"🎉 **BLACKJACK! You win ${winnings:,}!**"
             embed = discord.Embed(title="🎰 Blackjack", description=description, color=discord.Color.gold())
             embed.add_field(name="💰 Bet", value=f"**${game.bet_amount:,}**", inline=True)
             embed.add_field(name="🎴 Your Hand", value=f"{game.hand_to_string(game.player_hand)}\n**Total: {player_total}**", inline=False)
@@ -631,12 +698,17 @@ class Games(commands.Cog):
     @app_commands.choices(side=[app_commands.Choice(name="Player", value="player"), app_commands.Choice(name="Banker", value="banker"), app_commands.Choice(name="Tie", value="tie")])
     async def baccarat(self, interaction: discord.Interaction, bet: int, side: app_commands.Choice[str]):
         if bet < 100: return await interaction.response.send_message("❌ Minimum $100!", ephemeral=True)
-        if not can_afford(interaction.user.id, bet): return await interaction.response.send_message("❌ Not enough money!", ephemeral=True)
-        update_balance(interaction.user.id, -bet)
+        try:
+            round_id = await try_debit(interaction.user.id, bet, interaction.guild_id)
+        except EconomyUnavailable:
+            return await interaction.response.send_message(BANK_UNAVAILABLE_MESSAGE, ephemeral=True)
+        if round_id is None: return await interaction.response.send_message("❌ Not enough money!", ephemeral=True)
         game = BaccaratGame(interaction.user.id, bet, side.value)
-        if game.payout: update_balance(interaction.user.id, game.payout)
+        note = await settle_or_note(interaction.user.id, round_id, game.payout, "baccarat", guild_id=interaction.guild_id)
         embed = game.board_embed()
         embed.insert_field_at(0, name="", value=f"{'🟩' if game.outcome == game.side else '🟥'} Bet: {side.name} • ${bet:,}", inline=False)
+        if note:
+            embed.insert_field_at(0, name="", value=note, inline=False)
         await interaction.response.send_message(embed=embed, view=BaccaratView(game))
 
     @app_commands.command(name="mines", description="Play Mines!")
@@ -644,9 +716,16 @@ class Games(commands.Cog):
     async def mines(self, interaction: discord.Interaction, bet: int, mines: int = 3):
         if not (1 <= mines <= 10): return await interaction.response.send_message("❌ Mines: 1-10!", ephemeral=True)
         if bet < 100: return await interaction.response.send_message("❌ Minimum $100!", ephemeral=True)
-        if not can_afford(interaction.user.id, bet): return await interaction.response.send_message("❌ Not enough money!", ephemeral=True)
         if interaction.user.id in mines_games: return await interaction.response.send_message("❌ Finish active game!", ephemeral=True)
-        game = MinesGame(interaction.user.id, bet, mines)
+        try:
+            round_id = await try_debit(interaction.user.id, bet, interaction.guild_id)
+        except EconomyUnavailable:
+            return await interaction.response.send_message(BANK_UNAVAILABLE_MESSAGE, ephemeral=True)
+        if round_id is None: return await interaction.response.send_message("❌ Not enough money!", ephemeral=True)
+        if interaction.user.id in mines_games:
+            await settle_or_note(interaction.user.id, round_id, bet, guild_id=interaction.guild_id)
+            return await interaction.response.send_message("❌ Finish active game!", ephemeral=True)
+        game = MinesGame(interaction.user.id, bet, mines, round_id, interaction.guild_id)
         mines_games[interaction.user.id] = game
         embed = discord.Embed(title=" Mines Game", description=f"Bet: **${bet:,}** | Mines: **{mines}**", color=discord.Color.blue())
         embed.add_field(name="Multiplier", value="**1.00x**", inline=True).add_field(name="Potential Win", value=f"**${bet:,}**", inline=True).add_field(name="Revealed", value=f"**0** / {20 - mines}", inline=True)
@@ -654,8 +733,9 @@ class Games(commands.Cog):
 
     @app_commands.command(name="clearmines", description="Clear stuck mines game")
     async def clearmines(self, interaction: discord.Interaction):
-        if interaction.user.id in mines_games:
-            del mines_games[interaction.user.id]
+        game = mines_games.pop(interaction.user.id, None)
+        if game:
+            await settle_or_note(interaction.user.id, game.round_id, game.bet_amount, guild_id=game.guild_id)
             await interaction.response.send_message("Mines cleared!", ephemeral=True)
         else: await interaction.response.send_message("No active game.", ephemeral=True)
 
@@ -663,9 +743,16 @@ class Games(commands.Cog):
     @app_commands.describe(bet="Amount to bet")
     async def tower(self, interaction: discord.Interaction, bet: int):
         if bet < 100: return await interaction.response.send_message("❌ Minimum $100!", ephemeral=True)
-        if not can_afford(interaction.user.id, bet): return await interaction.response.send_message("❌ Not enough money!", ephemeral=True)
         if interaction.user.id in tower_games: return await interaction.response.send_message("❌ Finish active game!", ephemeral=True)
-        game = TowerGame(interaction.user.id, bet)
+        try:
+            round_id = await try_debit(interaction.user.id, bet, interaction.guild_id)
+        except EconomyUnavailable:
+            return await interaction.response.send_message(BANK_UNAVAILABLE_MESSAGE, ephemeral=True)
+        if round_id is None: return await interaction.response.send_message("❌ Not enough money!", ephemeral=True)
+        if interaction.user.id in tower_games:
+            await settle_or_note(interaction.user.id, round_id, bet, guild_id=interaction.guild_id)
+            return await interaction.response.send_message("❌ Finish active game!", ephemeral=True)
+        game = TowerGame(interaction.user.id, bet, round_id, interaction.guild_id)
         tower_games[interaction.user.id] = game
         embed = discord.Embed(title=" Tower Game", description=f"Level: **1 / 10**\nMultiplier: **1.00x**\nBet: **${bet:,}**", color=discord.Color.blurple())
         embed.add_field(name="Progress", value=game.progress_bar(), inline=False)
@@ -673,8 +760,9 @@ class Games(commands.Cog):
 
     @app_commands.command(name="cleartower", description="Clear stuck tower game")
     async def cleartower(self, interaction: discord.Interaction):
-        if interaction.user.id in tower_games:
-            del tower_games[interaction.user.id]
+        game = tower_games.pop(interaction.user.id, None)
+        if game:
+            await settle_or_note(interaction.user.id, game.round_id, game.bet, guild_id=game.guild_id)
             await interaction.response.send_message("Tower cleared!", ephemeral=True)
         else: await interaction.response.send_message("No active game.", ephemeral=True)
 
@@ -5,11 +5,99 @@ from datetime import datetime, timezone, timedelta
 from typing import Optional
 import json
 import aiohttp
+import asyncio
 import os
+import random
+import re
+import sqlite3
+import time
+import unicodedata
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 
 AI_MOD_CONFIG_FILE = "ai_mod_config.json"
+MOD_AUDIT_DB_FILE = "mod_audit.db"
+MODLOG_PAGE_SIZE = 10
+# Guild ID -> extra blocked terms, on top of the base list shipped with the bot
+MOD_BLOCKLIST_FILE = "mod_blocklists.json"
+MOD_BASE_BLOCKLIST_FILE = os.path.join("assets", "moderation", "blocklist.txt")
+MOD_BLOCKLIST_MAX_TERMS = 500
+# Normalized messages shorter than this ("ok", "gg", "lol") skip the model
+MOD_TRIVIAL_MAX_LENGTH = 3
 HUGGINGFACE_TOKEN = os.getenv("HUGGINGFACE_TOKEN")
 HF_MOD_MODEL = "unitary/toxic-bert"
+HF_MOD_URL = f"https://router.huggingface.co/hf-inference/models/{HF_MOD_MODEL}"
+# What to do while the moderation API is failing: "prefilter" keeps enforcing
+# the local blocklist, "allow" lets every message through until it recovers
+AI_MOD_FALLBACK = os.getenv("AI_MOD_FALLBACK", "prefilter").lower()
+
+# Circuit breaker: trips when at least MOD_BREAKER_ERROR_RATE of the last
+# MOD_BREAKER_WINDOW calls failed, then lets one probe through per cooldown
+MOD_BREAKER_WINDOW = 50
+MOD_BREAKER_MIN_CALLS = 10
+MOD_BREAKER_ERROR_RATE = 0.5
+MOD_BREAKER_COOLDOWN_SECONDS = 30
+# Timeouts follow observed latency: 3x the recent p95, clamped to this range
+MOD_TIMEOUT_MIN_SECONDS = 2.0
+MOD_TIMEOUT_MAX_SECONDS = 10.0
+MOD_MAX_RETRIES = 2
+MOD_RETRY_BASE_DELAY = 0.25
+
+# /purge: how many messages one run may delete, and how far back it may look
+PURGE_MAX_MESSAGES = 10000
+PURGE_MAX_SCANNED = 50000
+# Discord only bulk-deletes messages younger than 14 days; keep a margin
+BULK_DELETE_MAX_AGE = timedelta(days=14) - timedelta(minutes=5)
+# Older messages are deleted one at a time, at most this often
+PURGE_SINGLE_DELETE_INTERVAL = 1.0
+# How often long-running moderation jobs update their progress message
+MOD_PROGRESS_INTERVAL = 5.0
+# A slash command's response can only be edited for 15 minutes; jobs that run
+# longer move their progress and summary to a channel message before then
+INTERACTION_TOKEN_LIFETIME = timedelta(minutes=15)
+INTERACTION_TOKEN_MARGIN = timedelta(minutes=1)
+
+# /mass_action pacing per route: (actions per second, burst), shared by every
+# job in a guild. "dm" paces the notices sent before each action. discord.py
+# still handles any 429 that slips through; this keeps us from hitting them.
+MASS_ACTION_ROUTE_LIMITS = {"ban": (2.0, 5), "kick": (2.0, 5), "timeout": (4.0, 5), "dm": (1.0, 5)}
+MASS_ACTION_MAX_TARGETS = 1000
+MASS_ACTION_WORKERS = 10
+MASS_DM_CONCURRENCY = 5
+MASS_DM_TIMEOUT = 5.0
+
+# Messages from every guild are checked together: a batch is sent once it has
+# MOD_BATCH_MAX_ITEMS messages or its oldest has waited MOD_BATCH_WINDOW_MS
+MOD_BATCH_WINDOW_MS = 25
+MOD_BATCH_MAX_ITEMS = 32
+
+# Verdicts are cached by normalized text, so repeated spam is judged instantly
+MOD_VERDICT_CACHE_MAX_ENTRIES = 10000
+MOD_VERDICT_CACHE_TTL_SECONDS = 30 * 60
+
+# Anti-spam: guild ID -> overrides of ANTISPAM_DEFAULTS
+ANTISPAM_CONFIG_FILE = "antispam_config.json"
+ANTISPAM_ACTIONS = ("off", "delete", "timeout", "lockdown")
+ANTISPAM_DEFAULTS = {
+    "enabled": False,
+    "timeout_minutes": 10,
+    "lockdown_minutes": 10,
+    # Members who joined more recently than this count as new for raid detection
+    "new_member_minutes": 10,
+    "rules": {
+        # threshold events within `seconds` trigger the rule's action
+        "flood": {"action": "timeout", "threshold": 8, "seconds": 5},
+        "duplicates": {"action": "delete", "threshold": 3, "seconds": 20},
+        "mentions": {"action": "timeout", "threshold": 10, "seconds": 15},
+        # Messages from new members, while at least `joins` members joined within `join_seconds`
+        "raid": {"action": "lockdown", "threshold": 10, "seconds": 10, "joins": 8, "join_seconds": 120},
+    },
+}
+# Sliding windows are split into this many buckets, so a check costs the same at any rate
+ANTISPAM_BUCKETS = 10
+# Least recently active users/guilds are forgotten beyond these
+ANTISPAM_MAX_TRACKED_USERS = 100000
+ANTISPAM_MAX_TRACKED_GUILDS = 10000
 
 # In-memory cache for configs
 _ai_mod_configs_cache = {}
@@ -37,44 +125,1042 @@ def save_ai_mod_configs(configs):
     with open(AI_MOD_CONFIG_FILE, 'w') as f:
         json.dump(configs, f, indent=2)
 
-async def check_moderation(text: str, session: aiohttp.ClientSession) -> Optional[dict]:
-    """Check text against Hugging Face Toxicity API (Free alternative to OpenAI)."""
-    if not HUGGINGFACE_TOKEN:
+_mod_blocklists_cache = None
+
+def load_mod_blocklists():
+    global _mod_blocklists_cache
+    if _mod_blocklists_cache is not None:
+        return _mod_blocklists_cache
+    try:
+        with open(MOD_BLOCKLIST_FILE, 'r') as f:
+            data = json.load(f)
+        _mod_blocklists_cache = data if isinstance(data, dict) else {}
+    except (FileNotFoundError, json.JSONDecodeError):
+        _mod_blocklists_cache = {}
+    return _mod_blocklists_cache
+
+def save_mod_blocklists(blocklists):
+    global _mod_blocklists_cache
+    _mod_blocklists_cache = blocklists
+    with open(MOD_BLOCKLIST_FILE, 'w') as f:
+        json.dump(blocklists, f, indent=2)
+
+_antispam_configs_cache = None
+# Guild ID -> defaults merged with that guild's overrides
+_antispam_resolved = {}
+
+def load_antispam_configs():
+    global _antispam_configs_cache
+    if _antispam_configs_cache is not None:
+        return _antispam_configs_cache
+    try:
+        with open(ANTISPAM_CONFIG_FILE, 'r') as f:
+            data = json.load(f)
+        _antispam_configs_cache = data if isinstance(data, dict) else {}
+    except (FileNotFoundError, json.JSONDecodeError):
+        _antispam_configs_cache = {}
+    return _antispam_configs_cache
+
+def save_antispam_configs(configs):
+    global _antispam_configs_cache
+    _antispam_configs_cache = configs
+    _antispam_resolved.clear()
+    with open(ANTISPAM_CONFIG_FILE, 'w') as f:
+        json.dump(configs, f, indent=2)
+
+def antispam_config_for(guild_id: int) -> dict:
+    """The guild's anti-spam settings with defaults filled in"""
+    config = _antispam_resolved.get(guild_id)
+    if config is None:
+        overrides = load_antispam_configs().get(str(guild_id), {})
+        config = {**ANTISPAM_DEFAULTS, **{k: v for k, v in overrides.items() if k != "rules"}}
+        config["rules"] = {
+            rule: {**settings, **overrides.get("rules", {}).get(rule, {})}
+            for rule, settings in ANTISPAM_DEFAULTS["rules"].items()
+        }
+        _antispam_resolved[guild_id] = config
+    return config
+
+def load_base_blocklist():
+    try:
+        with open(MOD_BASE_BLOCKLIST_FILE, 'r', encoding='utf-8') as f:
+            return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    except FileNotFoundError:
+        return []
+
+_ZERO_WIDTH = dict.fromkeys(map(ord, "\u00ad\u180e\u200b\u200c\u200d\u200e\u200f\u2060\u2061\u2062\u2063\u2064\ufeff"))
+_REPEATS = re.compile(r"(.)\1{2,}", re.DOTALL)
+
+def normalize_for_verdict(text: str) -> str:
+    """Fold the tricks spam uses to dodge exact matches: case, spacing, zero-width characters and stretched letters."""
+    text = unicodedata.normalize("NFKC", text).translate(_ZERO_WIDTH).casefold()
+    text = " ".join(text.split())
+    # "heyyyyyy" and "heyyy" become "heyy"
+    return _REPEATS.sub(r"\1\1", text)
+
+def collapse_runs(text: str):
+    """Squash runs of a repeated letter to one, returning (text, run length of each character).
+
+    "scammm" -> ("scam", [1, 1, 1, 3]). Digits and symbols are left alone, so
+    "500$" stays "500$".
+    """
+    chars, runs = [], []
+    for ch in text:
+        if chars and ch == chars[-1] and ch.isalpha():
+            runs[-1] += 1
+        else:
+            chars.append(ch)
+            runs.append(1)
+    return "".join(chars), runs
+
+class AhoCorasick:
+    """Multi-pattern matcher: one pass over the text finds every pattern in it."""
+
+    def __init__(self, patterns):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        for pattern in patterns:
+            state = 0
+            for ch in pattern:
+                next_state = self._goto[state].get(ch)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][ch] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                state = next_state
+            self._out[state].append(pattern)
+
+        # Breadth-first, so every failure link points at a state already finished
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(ch, 0)
+                self._out[next_state] += self._out[self._fail[next_state]]
+
+    def finditer(self, text):
+        """Yield (start, end, pattern) for every occurrence, in order of end position"""
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for pattern in out[state]:
+                yield i + 1 - len(pattern), i + 1, pattern
+
+def _is_word_char(ch):
+    return ch.isalnum() or ch == "_"
+
+class BlocklistMatcher:
+    """Blocked terms, matched however far the text stretches their letters.
+
+    Terms and text are matched with letter runs collapsed, then each letter
+    of the term must be backed by a run at least as long as in the term:
+    "scam" matches "scammm", but "ass" doesn't match "as". Terms edged by
+    word characters must match whole words.
+    """
+
+    def __init__(self, terms):
+        # Collapsed form -> [(term, run lengths)]; "as" and "ass" share one pattern
+        self._terms = {}
+        for term in terms:
+            collapsed, runs = collapse_runs(term)
+            self._terms.setdefault(collapsed, []).append((term, runs))
+        self._automaton = AhoCorasick(self._terms)
+
+    def find(self, text: str) -> Optional[str]:
+        """First blocked term in normalized `text`, or None"""
+        text, text_runs = collapse_runs(text)
+        for start, end, pattern in self._automaton.finditer(text):
+            if _is_word_char(pattern[0]) and start > 0 and _is_word_char(text[start - 1]):
+                continue
+            if _is_word_char(pattern[-1]) and end < len(text) and _is_word_char(text[end]):
+                continue
+            for term, runs in self._terms[pattern]:
+                if all(have >= need for have, need in zip(text_runs[start:end], runs)):
+                    return term
         return None
-    
-    url = f"https://router.huggingface.co/hf-inference/models/{HF_MOD_MODEL}"
+
+def is_trivial(normalized: str) -> bool:
+    """Too short, or without any letters (emoji, punctuation, numbers), for the model to judge"""
+    return len(normalized) < MOD_TRIVIAL_MAX_LENGTH or not any(ch.isalpha() for ch in normalized)
+
+class VerdictCache:
+    """LRU cache of moderation verdicts with a TTL."""
+
+    def __init__(self, max_entries=MOD_VERDICT_CACHE_MAX_ENTRIES, ttl=MOD_VERDICT_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[dict]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            del self._entries[key]
+        self.misses += 1
+        return None
+
+    def put(self, key: str, verdict: dict):
+        self._entries[key] = (time.monotonic() + self.ttl, verdict)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+def _verdict_from_scores(scores) -> dict:
+    flagged = False
+    categories = {}
+
+    # Mapping HF labels to a similar structure as OpenAI for compatibility
+    for entry in scores:
+        label = entry["label"].lower()
+        score = entry["score"]
+        # Threshold for flagging (usually > 0.7 for high confidence)
+        is_flagged = score > 0.7
+        categories[label] = is_flagged
+        if is_flagged:
+            flagged = True
+
+    return {"flagged": flagged, "categories": categories}
+
+class CircuitBreaker:
+    """Tracks an endpoint's recent errors and latency, and stops calling it while it is failing."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._outcomes = deque(maxlen=MOD_BREAKER_WINDOW)
+        self._latencies = deque(maxlen=MOD_BREAKER_WINDOW)
+        self.state = "closed"
+        self._opened_at = 0.0
+        self._probe_started = None
+        self.rejected = 0
+
+    @property
+    def is_open(self) -> bool:
+        """True while calls are being refused outright"""
+        return self.state == "open" and time.monotonic() < self._opened_at + MOD_BREAKER_COOLDOWN_SECONDS
+
+    def error_rate(self) -> float:
+        return self._outcomes.count(False) / len(self._outcomes) if self._outcomes else 0.0
+
+    def latency_p95(self) -> Optional[float]:
+        if not self._latencies:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+    def timeout(self) -> float:
+        p95 = self.latency_p95()
+        if p95 is None:
+            return MOD_TIMEOUT_MAX_SECONDS
+        return min(MOD_TIMEOUT_MAX_SECONDS, max(MOD_TIMEOUT_MIN_SECONDS, p95 * 3))
+
+    def allow(self) -> bool:
+        now = time.monotonic()
+        if self.state == "closed":
+            return True
+        if self.state == "open" and now >= self._opened_at + MOD_BREAKER_COOLDOWN_SECONDS:
+            self.state = "half_open"
+        # One probe at a time; a probe that never reported back is replaced after a cooldown
+        if self.state == "half_open" and (self._probe_started is None or now - self._probe_started > MOD_BREAKER_COOLDOWN_SECONDS):
+            self._probe_started = now
+            return True
+        self.rejected += 1
+        return False
+
+    def record(self, ok: bool, latency: Optional[float] = None):
+        if ok and latency is not None:
+            self._latencies.append(latency)
+        if self.state == "half_open":
+            self._probe_started = None
+            if ok:
+                print(f"Circuit for {self.name} closed", flush=True)
+                self.state = "closed"
+                self._outcomes.clear()
+            else:
+                self._open()
+            return
+        self._outcomes.append(ok)
+        if self.state == "closed" and len(self._outcomes) >= MOD_BREAKER_MIN_CALLS and self.error_rate() >= MOD_BREAKER_ERROR_RATE:
+            print(f"Circuit for {self.name} opened ({self.error_rate():.0%} errors)", flush=True)
+            self._open()
+
+    def _open(self):
+        self.state = "open"
+        self._opened_at = time.monotonic()
+
+# One breaker per endpoint URL
+_breakers = {}
+
+def get_breaker(url: str) -> CircuitBreaker:
+    breaker = _breakers.get(url)
+    if breaker is None:
+        breaker = _breakers[url] = CircuitBreaker(url)
+    return breaker
+
+async def check_moderation_batch(texts: list, session: aiohttp.ClientSession) -> list:
+    """Check several texts in one Hugging Face request; one verdict (or None) per text."""
+    if not HUGGINGFACE_TOKEN:
+        return [None] * len(texts)
+
     headers = {"Authorization": f"Bearer {HUGGINGFACE_TOKEN}"}
-    payload = {"inputs": text}
-    
-    try:
-        async with session.post(url, headers=headers, json=payload, timeout=10) as resp:
-            if resp.status == 200:
-                results = await resp.json()
-                # HF returns a list of lists of dicts: [[{"label": "toxic", "score": 0.9}, ...]]
-                if not results or not isinstance(results, list):
-                    return None
-                
-                scores = results[0] if isinstance(results[0], list) else results
-                flagged = False
-                categories = {}
-                
-                # Mapping HF labels to a similar structure as OpenAI for compatibility
-                for entry in scores:
-                    label = entry["label"].lower()
-                    score = entry["score"]
-                    # Threshold for flagging (usually > 0.7 for high confidence)
-                    is_flagged = score > 0.7
-                    categories[label] = is_flagged
-                    if is_flagged:
-                        flagged = True
-                
-                return {"flagged": flagged, "categories": categories}
-            elif resp.status == 503:
-                return None
+    payload = {"inputs": texts}
+    breaker = get_breaker(HF_MOD_URL)
+
+    for attempt in range(MOD_MAX_RETRIES + 1):
+        if not breaker.allow():
+            return [None] * len(texts)
+        started = time.monotonic()
+        try:
+            async with session.post(HF_MOD_URL, headers=headers, json=payload, timeout=aiohttp.ClientTimeout(total=breaker.timeout())) as resp:
+                if resp.status == 200:
+                    results = await resp.json()
+                    breaker.record(True, time.monotonic() - started)
+                    break
+                # 503 is the model loading; 429 and 5xx are worth another try too
+                retryable = resp.status == 429 or resp.status >= 500
+        except (asyncio.TimeoutError, aiohttp.ClientError, ValueError):
+            retryable = True
+        breaker.record(False)
+        # Only retry against a healthy endpoint; a struggling one gets no extra load
+        if not retryable or attempt == MOD_MAX_RETRIES or breaker.state != "closed":
+            return [None] * len(texts)
+        await asyncio.sleep(MOD_RETRY_BASE_DELAY * 2 ** attempt * random.uniform(0.5, 1.5))
+
+    # HF returns a list of lists of dicts, one list per input: [[{"label": "toxic", "score": 0.9}, ...], ...]
+    if not results or not isinstance(results, list):
+        return [None] * len(texts)
+    if isinstance(results[0], dict):
+        results = [results]
+    if len(results) != len(texts):
+        return [None] * len(texts)
+    return [_verdict_from_scores(scores) for scores in results]
+
+async def check_moderation(text: str, session: aiohttp.ClientSession) -> Optional[dict]:
+    """Check text against Hugging Face Toxicity API (Free alternative to OpenAI)."""
+    return (await check_moderation_batch([text], session))[0]
+
+class ModerationBatcher:
+    """Coalesces toxicity checks from every guild into batched HF requests.
+
+    Callers await check() as if it were a single request; the verdicts of a
+    batch are fanned back out to them when the response arrives. Texts that
+    normalize the same are answered from the verdict cache, or share the
+    request already in flight for them.
+    """
+
+    def __init__(self, get_session, window_ms=MOD_BATCH_WINDOW_MS, max_items=MOD_BATCH_MAX_ITEMS):
+        self.get_session = get_session
+        self.window_ms = window_ms
+        self.max_items = max_items
+        self._pending = []
+        self._timer = None
+        # Normalized text -> future of the request already checking it
+        self._inflight = {}
+        self.cache = VerdictCache()
+        self.requests_sent = 0
+        self.texts_checked = 0
+        self.coalesced = 0
+        self.failed_fast = 0
+
+    async def check(self, text: str, key: Optional[str] = None) -> Optional[dict]:
+        if not HUGGINGFACE_TOKEN:
+            return None
+        key = key if key is not None else normalize_for_verdict(text)
+        verdict = self.cache.get(key)
+        if verdict is not None:
+            return verdict
+        # Fail fast rather than queue behind an endpoint that is down
+        if get_breaker(HF_MOD_URL).is_open:
+            self.failed_fast += 1
+            return None
+
+        future = self._inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+        else:
+            future = self._inflight[key] = asyncio.get_running_loop().create_future()
+            self._pending.append((key, text, future))
+            if len(self._pending) >= self.max_items:
+                self._flush()
+            elif self._timer is None:
+                self._timer = asyncio.create_task(self._flush_after_window())
+        # Shielded so one cancelled waiter can't cancel the others' result
+        return await asyncio.shield(future)
+
+    async def _flush_after_window(self):
+        await asyncio.sleep(self.window_ms / 1000)
+        self._timer = None
+        self._flush()
+
+    def _flush(self):
+        batch, self._pending = self._pending, []
+        if batch:
+            asyncio.create_task(self._send(batch))
+
+    async def _send(self, batch):
+        self.requests_sent += 1
+        self.texts_checked += len(batch)
+        try:
+            verdicts = await check_moderation_batch([text for _, text, _ in batch], self.get_session())
+        except Exception as e:
+            print(f"Moderation batch failed: {e}")
+            verdicts = [None] * len(batch)
+        for (key, _, future), verdict in zip(batch, verdicts):
+            del self._inflight[key]
+            # Failures aren't cached, so the next copy gets a fresh check
+            if verdict is not None:
+                self.cache.put(key, verdict)
+            if not future.done():
+                future.set_result(verdict)
+
+class JobStatus:
+    """Progress and summary display for a long job started by a slash command.
+
+    Edits the command's response while its token is valid, then switches to
+    a message in the channel that pings the moderator.
+    """
+
+    def __init__(self, interaction: discord.Interaction):
+        self.interaction = interaction
+        self.expires_at = interaction.created_at + INTERACTION_TOKEN_LIFETIME - INTERACTION_TOKEN_MARGIN
+        self.channel_message = None
+
+    @property
+    def token_expired(self) -> bool:
+        return datetime.now(timezone.utc) >= self.expires_at
+
+    async def update(self, content=None, embed=None):
+        try:
+            if not self.token_expired:
+                await self.interaction.edit_original_response(content=content, embed=embed, view=None)
+                return
+            content = f"{self.interaction.user.mention} {content or ''}".rstrip()
+            if self.channel_message is None:
+                self.channel_message = await self.interaction.channel.send(content=content, embed=embed)
             else:
-                return None
-    except Exception:
-        return None
+                await self.channel_message.edit(content=content, embed=embed)
+        except discord.HTTPException as e:
+            print(f"Failed to update job status in {self.interaction.channel_id}: {e}")
+
+class PurgeJob:
+    """Deletes matching messages from a channel's history, streamed newest first.
+
+    Messages young enough are bulk-deleted 100 at a time; older ones go to a
+    queue that deletes them singly, paced to stay inside the rate limit. Both
+    run concurrently, since they use different routes.
+    """
+
+    def __init__(self, channel, limit, check, after=None, before=None, on_progress=None):
+        self.channel = channel
+        self.limit = limit
+        self.check = check
+        self.after = after
+        self.before = before
+        self.on_progress = on_progress
+        self.scanned = 0
+        self.matched = 0
+        self.bulk_deleted = 0
+        self.single_deleted = 0
+        self.failed = 0
+        self.done = False
+
+    @property
+    def deleted(self):
+        return self.bulk_deleted + self.single_deleted
+
+    async def run(self):
+        old_messages = asyncio.Queue()
+        single_deleter = asyncio.create_task(self._delete_singly(old_messages))
+        reporter = asyncio.create_task(self._report_progress()) if self.on_progress else None
+        try:
+            bulk = []
+            bulk_cutoff = datetime.now(timezone.utc) - BULK_DELETE_MAX_AGE
+            async for message in self.channel.history(limit=PURGE_MAX_SCANNED, after=self.after, before=self.before, oldest_first=False):
+                self.scanned += 1
+                if not self.check(message):
+                    continue
+                self.matched += 1
+                if message.created_at > bulk_cutoff:
+                    bulk.append(message)
+                    if len(bulk) == 100:
+                        await self._delete_bulk(bulk)
+                        bulk = []
+                else:
+                    old_messages.put_nowait(message)
+                if self.matched >= self.limit:
+                    break
+            if bulk:
+                await self._delete_bulk(bulk)
+            old_messages.put_nowait(None)
+            await single_deleter
+        finally:
+            single_deleter.cancel()
+            self.done = True
+            if reporter:
+                reporter.cancel()
+
+    async def _delete_bulk(self, messages):
+        try:
+            await self.channel.delete_messages(messages)
+            self.bulk_deleted += len(messages)
+        except discord.NotFound:
+            # Someone else deleted one of them; fall back to one by one
+            for message in messages:
+                await self._delete_one(message)
+        except discord.HTTPException as e:
+            print(f"Bulk delete failed in {self.channel.id}: {e}")
+            self.failed += len(messages)
+
+    async def _delete_one(self, message):
+        try:
+            await message.delete()
+            self.single_deleted += 1
+        except discord.NotFound:
+            pass
+        except discord.HTTPException:
+            self.failed += 1
+
+    async def _delete_singly(self, queue):
+        while (message := await queue.get()) is not None:
+            started = time.monotonic()
+            await self._delete_one(message)
+            # discord.py waits out 429s itself; pacing keeps us from hitting them
+            await asyncio.sleep(max(0.0, PURGE_SINGLE_DELETE_INTERVAL - (time.monotonic() - started)))
+
+    async def _report_progress(self):
+        while True:
+            await asyncio.sleep(MOD_PROGRESS_INTERVAL)
+            await self.on_progress(self)
+
+class SlidingWindowCounter:
+    """Events over the last `window` seconds, kept in a fixed ring of time buckets.
+
+    Adding and totalling touch ANTISPAM_BUCKETS slots regardless of traffic;
+    the window edge is accurate to one bucket width.
+    """
+
+    __slots__ = ("width", "counts", "ticks")
+
+    def __init__(self, window: float):
+        self.width = window / ANTISPAM_BUCKETS
+        self.counts = [0] * ANTISPAM_BUCKETS
+        self.ticks = [-1] * ANTISPAM_BUCKETS
+
+    def add(self, now: float, amount: int = 1) -> int:
+        tick = int(now / self.width)
+        slot = tick % ANTISPAM_BUCKETS
+        if self.ticks[slot] != tick:
+            self.ticks[slot] = tick
+            self.counts[slot] = 0
+        self.counts[slot] += amount
+        return self.total(now)
+
+    def total(self, now: float) -> int:
+        oldest = int(now / self.width) - ANTISPAM_BUCKETS
+        return sum(count for count, tick in zip(self.counts, self.ticks) if tick > oldest)
+
+class _UserActivity:
+    __slots__ = ("messages", "duplicates", "mentions", "last_hash", "episodes")
+
+    def __init__(self, rules):
+        self.messages = SlidingWindowCounter(rules["flood"]["seconds"])
+        self.duplicates = SlidingWindowCounter(rules["duplicates"]["seconds"])
+        self.mentions = SlidingWindowCounter(rules["mentions"]["seconds"])
+        self.last_hash = None
+        # "delete" or "timeout" -> when the user's current episode of it ends
+        self.episodes = {}
+
+class _GuildActivity:
+    __slots__ = ("joins", "new_member_messages", "lockdown_until")
+
+    def __init__(self, rules):
+        self.joins = SlidingWindowCounter(rules["raid"]["join_seconds"])
+        self.new_member_messages = SlidingWindowCounter(rules["raid"]["seconds"])
+        self.lockdown_until = 0.0
+
+class SpamDetector:
+    """Flood, duplicate, mention-spam and raid detection, entirely in memory.
+
+    `check` is synchronous and does a fixed amount of work per message, so
+    it can sit in front of everything else on the message path. Per-user
+    and per-guild state is evicted least recently active first.
+    """
+
+    def __init__(self, max_users: int = ANTISPAM_MAX_TRACKED_USERS, max_guilds: int = ANTISPAM_MAX_TRACKED_GUILDS):
+        self.max_users = max_users
+        self.max_guilds = max_guilds
+        self._users = OrderedDict()
+        self._guilds = OrderedDict()
+        self.triggered = Counter()
+
+    def _user(self, guild_id, user_id, rules):
+        key = (guild_id, user_id)
+        state = self._users.get(key)
+        if state is None:
+            state = self._users[key] = _UserActivity(rules)
+            if len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+        else:
+            self._users.move_to_end(key)
+        return state
+
+    def _guild(self, guild_id, rules):
+        state = self._guilds.get(guild_id)
+        if state is None:
+            state = self._guilds[guild_id] = _GuildActivity(rules)
+            if len(self._guilds) > self.max_guilds:
+                self._guilds.popitem(last=False)
+        else:
+            self._guilds.move_to_end(guild_id)
+        return state
+
+    def reset(self, guild_id: int):
+        """Forget a guild's counters (their windows follow its config)"""
+        self._guilds.pop(guild_id, None)
+        for key in [key for key in self._users if key[0] == guild_id]:
+            del self._users[key]
+
+    def record_join(self, guild_id: int, config: dict, now: Optional[float] = None):
+        self._guild(guild_id, config["rules"]).joins.add(now or time.time())
+
+    def in_lockdown(self, guild_id: int, now: Optional[float] = None) -> bool:
+        state = self._guilds.get(guild_id)
+        return state is not None and state.lockdown_until > (now or time.time())
+
+    def begin_lockdown(self, guild_id: int, config: dict, now: Optional[float] = None) -> bool:
+        """Start a lockdown unless one is running; True if this call started it"""
+        now = now or time.time()
+        state = self._guild(guild_id, config["rules"])
+        if state.lockdown_until > now:
+            return False
+        state.lockdown_until = now + config["lockdown_minutes"] * 60
+        return True
+
+    def check(self, guild_id: int, user_id: int, content: str, mention_count: int, joined_at: Optional[float], config: dict, now: Optional[float] = None):
+        """Count one message; returns (rule, action, first) if it breaks a rule, else None.
+
+        `first` is True for the first violation in the user's current episode
+        of that kind of action (delete, or timeout/lockdown), which is when
+        timeouts and log entries are due.
+        """
+        now = now or time.time()
+        rules = config["rules"]
+        user = self._user(guild_id, user_id, rules)
+        guild = self._guild(guild_id, rules)
+
+        messages = user.messages.add(now)
+        mentions = user.mentions.add(now, mention_count) if mention_count else user.mentions.total(now)
+        content_hash = hash(normalize_for_verdict(content)) if content else None
+        duplicates = 0
+        if content_hash is not None and content_hash == user.last_hash:
+            duplicates = user.duplicates.add(now)
+        user.last_hash = content_hash
+
+        is_new_member = joined_at is not None and now - joined_at <= config["new_member_minutes"] * 60
+        new_member_messages = guild.new_member_messages.add(now) if is_new_member else 0
+
+        violated = None
+        if is_new_member and guild.lockdown_until > now:
+            violated = ("lockdown", "timeout")
+        else:
+            raid = rules["raid"]
+            checks = (
+                ("raid", new_member_messages >= raid["threshold"] and guild.joins.total(now) >= raid["joins"]),
+                ("mentions", mentions >= rules["mentions"]["threshold"]),
+                ("flood", messages >= rules["flood"]["threshold"]),
+                ("duplicates", duplicates >= rules["duplicates"]["threshold"]),
+            )
+            for rule, hit in checks:
+                if hit and rules[rule]["action"] != "off":
+                    violated = (rule, rules[rule]["action"])
+                    break
+        if violated is None:
+            return None
+
+        rule, action = violated
+        self.triggered[rule] += 1
+        # Episodes are tracked per kind of punishment, so a delete-only rule
+        # firing first can't use up the timeout a later flood deserves
+        kind = "delete" if action == "delete" else "timeout"
+        first = user.episodes.get(kind, 0.0) <= now
+        if first:
+            user.episodes[kind] = now + rules["raid" if rule == "lockdown" else rule]["seconds"]
+        return rule, action, first
+
+class ModAuditLog:
+    """Append-only record of moderation actions in SQLite.
+
+    Rows are never updated or deleted (triggers refuse it). Queries page by
+    row ID (keyset paging) over indexes on guild, target and time, so a
+    page costs the same however long the log grows. Writes are buffered and
+    committed together on the log's own worker thread.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mod-audit")
+        self._conn = None
+        self._buffer = []
+        self._flush_task = None
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS mod_actions (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    guild_id INTEGER NOT NULL,
+                    action TEXT NOT NULL,
+                    target_id INTEGER,
+                    moderator_id INTEGER,
+                    reason TEXT,
+                    details TEXT,
+                    created_at INTEGER NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_mod_actions_guild ON mod_actions(guild_id, id);
+                CREATE INDEX IF NOT EXISTS idx_mod_actions_target ON mod_actions(guild_id, target_id, id);
+                CREATE INDEX IF NOT EXISTS idx_mod_actions_action ON mod_actions(guild_id, action, id);
+                CREATE INDEX IF NOT EXISTS idx_mod_actions_time ON mod_actions(guild_id, created_at);
+                CREATE TRIGGER IF NOT EXISTS mod_actions_no_update BEFORE UPDATE ON mod_actions
+                    BEGIN SELECT RAISE(ABORT, 'mod_actions is append-only'); END;
+                CREATE TRIGGER IF NOT EXISTS mod_actions_no_delete BEFORE DELETE ON mod_actions
+                    BEGIN SELECT RAISE(ABORT, 'mod_actions is append-only'); END;
+            """)
+            self._conn = conn
+        return self._conn
+
+    async def run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    def record(self, guild_id, action, target_id=None, moderator_id=None, reason=None, details=None):
+        """Queue an action for the log; it is written within a moment, batched with its neighbours"""
+        self._buffer.append((guild_id, action, target_id, moderator_id, reason, details, int(time.time())))
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self.flush())
+
+    async def flush(self):
+        while self._buffer:
+            rows, self._buffer = self._buffer, []
+            try:
+                await self.run(self._insert, rows)
+            except sqlite3.Error as e:
+                print(f"Failed to write {len(rows)} moderation log entries: {e}")
+
+    def _insert(self, rows):
+        conn = self.conn
+        conn.execute("BEGIN")
+        try:
+            conn.executemany(
+                "INSERT INTO mod_actions (guild_id, action, target_id, moderator_id, reason, details, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _query(self, guild_id, target_id, action, since, before_id, after_id, limit):
+        sql = "SELECT id, action, target_id, moderator_id, reason, details, created_at FROM mod_actions WHERE guild_id = ?"
+        params = [guild_id]
+        if since is not None:
+            # IDs grow with time, so the time index turns `since` into an ID
+            # bound that every other index can page from
+            first = self.conn.execute(
+                "SELECT id FROM mod_actions WHERE guild_id = ? AND created_at >= ? ORDER BY created_at LIMIT 1",
+                (guild_id, since),
+            ).fetchone()
+            if first is None:
+                return []
+            sql += " AND id >= ?"
+            params.append(first[0])
+        if target_id is not None:
+            sql += " AND target_id = ?"
+            params.append(target_id)
+        if action is not None:
+            sql += " AND action = ?"
+            params.append(action)
+        if after_id is not None:
+            # Paging towards newer entries: take the next ones up, then flip to newest first
+            sql += " AND id > ? ORDER BY id ASC LIMIT ?"
+            params += [after_id, limit]
+            return self.conn.execute(sql, params).fetchall()[::-1]
+        if before_id is not None:
+            sql += " AND id < ?"
+            params.append(before_id)
+        sql += " ORDER BY id DESC LIMIT ?"
+        params.append(limit)
+        return self.conn.execute(sql, params).fetchall()
+
+    async def query(self, guild_id, target_id=None, action=None, since=None, before_id=None, after_id=None, limit=MODLOG_PAGE_SIZE):
+        """Entries newest first, older than `before_id` or newer than `after_id`, optionally none before `since`"""
+        return await self.run(self._query, guild_id, target_id, action, since, before_id, after_id, limit)
+
+    async def aclose(self):
+        await self.flush()
+        if self._conn is not None:
+            await self.run(self._conn.close)
+            self._conn = None
+        self._executor.shutdown(wait=False)
+
+_audit_log = ModAuditLog(MOD_AUDIT_DB_FILE)
+
+def record_mod_action(guild_id, action, target_id=None, moderator_id=None, reason=None, details=None):
+    """Add an action to the moderation audit log"""
+    _audit_log.record(guild_id, action, target_id, moderator_id, reason, details)
+
+class TokenBucket:
+    """Paces calls to `rate` per second, allowing bursts of up to `burst`."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        # The lock makes waiters take tokens in arrival order
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+class RouteScheduler:
+    """One token bucket per API route, so different actions don't share a budget."""
+
+    def __init__(self, limits=MASS_ACTION_ROUTE_LIMITS):
+        self._buckets = {route: TokenBucket(rate, burst) for route, (rate, burst) in limits.items()}
+
+    async def run(self, route, func, *args, **kwargs):
+        await self._buckets[route].acquire()
+        return await func(*args, **kwargs)
+
+# Guild ID -> RouteScheduler; overlapping jobs in a guild draw on the same buckets
+_route_schedulers = {}
+
+def route_scheduler(guild_id):
+    """The route scheduler shared by every mass action in a guild"""
+    scheduler = _route_schedulers.get(guild_id)
+    if scheduler is None:
+        scheduler = _route_schedulers[guild_id] = RouteScheduler()
+    return scheduler
+
+class MassActionJob:
+    """Bans, kicks or times out a list of members.
+
+    Workers DM each member first (at most MASS_DM_CONCURRENCY at once), then
+    perform the action. Both go through the guild's shared route scheduler.
+    """
+
+    def __init__(self, action, members, moderator, reason=None, timeout_minutes=60, notify=True, on_progress=None):
+        self.action = action
+        self.members = members
+        self.moderator = moderator
+        self.reason = reason
+        self.timeout_minutes = timeout_minutes
+        self.notify = notify
+        self.on_progress = on_progress
+        self.scheduler = route_scheduler(moderator.guild.id)
+        self._dm_limit = asyncio.Semaphore(MASS_DM_CONCURRENCY)
+        self.succeeded = 0
+        self.failures = []
+        self.dms_sent = 0
+        self.started = None
+
+    @property
+    def processed(self):
+        return self.succeeded + len(self.failures)
+
+    def throughput(self):
+        elapsed = time.monotonic() - self.started if self.started else 0
+        return self.processed / elapsed if elapsed > 0 else 0.0
+
+    async def run(self):
+        self.started = time.monotonic()
+        queue = asyncio.Queue()
+        for member in self.members:
+            queue.put_nowait(member)
+        workers = [asyncio.create_task(self._work(queue)) for _ in range(min(MASS_ACTION_WORKERS, len(self.members)))]
+        reporter = asyncio.create_task(self._report_progress()) if self.on_progress else None
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            for worker in workers:
+                worker.cancel()
+            if reporter:
+                reporter.cancel()
+
+    async def _work(self, queue):
+        while not queue.empty():
+            member = queue.get_nowait()
+            if self.notify:
+                await self._notify(member)
+            try:
+                await self.scheduler.run(self.action, self._act, member)
+                self.succeeded += 1
+                details = f"mass action, {self.timeout_minutes} min" if self.action == "timeout" else "mass action"
+                record_mod_action(member.guild.id, self.action, member.id, self.moderator.id, self.reason, details)
+            except discord.HTTPException as e:
+                self.failures.append((member, str(e)))
+            except Exception as e:
+                # Anything unexpected fails this member, not the whole job
+                print(f"Mass {self.action} failed for {member.id}: {e!r}")
+                self.failures.append((member, repr(e)))
+
+    async def _act(self, member):
+        audit_reason = self.reason or f"Mass {self.action} by {self.moderator}"
+        if self.action == "ban":
+            await member.ban(reason=audit_reason, delete_message_seconds=0)
+        elif self.action == "kick":
+            await member.kick(reason=audit_reason)
+        else:
+            until = datetime.now(timezone.utc) + timedelta(minutes=self.timeout_minutes)
+            await member.timeout(until, reason=audit_reason)
+
+    async def _notify(self, member):
+        titles = {"ban": "You have been banned from", "kick": "You have been kicked from", "timeout": "You have been timed out in"}
+        embed = make_mod_embed(title=f"{titles[self.action]} {member.guild.name}", color=discord.Color.red(), user=member, moderator=self.moderator, reason=self.reason)
+        async with self._dm_limit:
+            try:
+                await self.scheduler.run("dm", self._send_dm, member, embed)
+                self.dms_sent += 1
+            except (discord.HTTPException, asyncio.TimeoutError):
+                pass
+
+    async def _send_dm(self, member, embed):
+        # The timeout starts once the bucket lets the DM through
+        await asyncio.wait_for(member.send(embed=embed), MASS_DM_TIMEOUT)
+
+    async def _report_progress(self):
+        while True:
+            await asyncio.sleep(MOD_PROGRESS_INTERVAL)
+            await self.on_progress(self)
+
+class MassActionConfirmView(discord.ui.View):
+    def __init__(self, moderator_id: int):
+        super().__init__(timeout=60)
+        self.moderator_id = moderator_id
+        self.confirmed = None
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        return interaction.user.id == self.moderator_id
+
+    @discord.ui.button(label="Confirm", style=discord.ButtonStyle.danger)
+    async def confirm(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.confirmed = True
+        await interaction.response.edit_message(view=None)
+        self.stop()
+
+    @discord.ui.button(label="Cancel", style=discord.ButtonStyle.secondary)
+    async def cancel(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.confirmed = False
+        await interaction.response.edit_message(content="Cancelled.", embed=None, view=None)
+        self.stop()
+
+MODLOG_ACTION_LABELS = {
+    "ban": "🔨 Ban",
+    "kick": "👢 Kick",
+    "timeout": "⏳ Timeout",
+    "untimeout": "✅ Timeout removed",
+    "purge": "🧹 Purge",
+    "ai_delete": "🤖 AI removal",
+    "antispam": "🚫 Anti-spam",
+    "lockdown": "🔒 Raid lockdown",
+}
+
+def make_modlog_embed(guild, rows, target=None):
+    """Render one page of audit log rows, newest first."""
+    title = f"📜 Moderation Log — {target}" if target else f"📜 Moderation Log — {guild.name}"
+    embed = discord.Embed(title=title, color=discord.Color.blurple(), timestamp=datetime.now(timezone.utc))
+    if not rows:
+        embed.description = "No matching entries."
+        return embed
+    lines = []
+    for entry_id, action, target_id, moderator_id, reason, details, created_at in rows:
+        line = f"`#{entry_id}` <t:{created_at}:R> **{MODLOG_ACTION_LABELS.get(action, action)}**"
+        if target_id:
+            line += f" <@{target_id}>"
+        line += f" by <@{moderator_id}>" if moderator_id else " by AutoMod"
+        if reason:
+            line += f"\n↳ {reason[:150]}"
+        if details:
+            line += f"\n↳ {details[:150]}"
+        lines.append(line)
+    embed.description = "\n".join(lines)[:4096]
+    return embed
+
+class ModLogView(discord.ui.View):
+    """Older/Newer paging over the audit log, keyed by the IDs on the current page."""
+
+    def __init__(self, moderator_id: int, guild, target=None, action=None, since=None):
+        super().__init__(timeout=300)
+        self.moderator_id = moderator_id
+        self.guild = guild
+        self.target = target
+        self.action = action
+        self.since = since
+        self.rows = []
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        return interaction.user.id == self.moderator_id
+
+    async def load(self, before_id=None, after_id=None):
+        rows = await _audit_log.query(
+            self.guild.id,
+            target_id=self.target.id if self.target else None,
+            action=self.action,
+            since=self.since,
+            before_id=before_id,
+            after_id=after_id,
+            limit=MODLOG_PAGE_SIZE + 1,
+        )
+        # One extra row tells us whether there is another page in that direction
+        more = len(rows) > MODLOG_PAGE_SIZE
+        if after_id is not None:
+            self.rows = rows[-MODLOG_PAGE_SIZE:]
+            self.newer.disabled = not more
+            self.older.disabled = False
+        else:
+            self.rows = rows[:MODLOG_PAGE_SIZE]
+            self.older.disabled = not more
+            self.newer.disabled = before_id is None
+        return make_modlog_embed(self.guild, self.rows, self.target)
+
+    @discord.ui.button(label="◀ Newer", style=discord.ButtonStyle.secondary)
+    async def newer(self, interaction: discord.Interaction, button: discord.ui.Button):
+        embed = await self.load(after_id=self.rows[0][0] if self.rows else None)
+        await interaction.response.edit_message(embed=embed, view=self)
+
+    @discord.ui.button(label="Older ▶", style=discord.ButtonStyle.secondary)
+    async def older(self, interaction: discord.Interaction, button: discord.ui.Button):
+        embed = await self.load(before_id=self.rows[-1][0] if self.rows else None)
+        await interaction.response.edit_message(embed=embed, view=self)
 
 def make_mod_embed(title, color, *, user, moderator, reason=None, extra_fields=None):
     """Build a consistent moderation embed UI."""
@@ -95,16 +1181,85 @@ class Moderation(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
         self._session: Optional[aiohttp.ClientSession] = None
+        self.batcher = ModerationBatcher(self.get_session)
+        self.base_blocklist = [normalize_for_verdict(term) for term in load_base_blocklist()]
+        # Guild ID -> compiled matcher over the base list plus the guild's own terms
+        self._matchers = {}
+        # Messages decided by each stage: blocklist, trivial, model
+        self.stage_hits = Counter()
+        self.spam_detector = SpamDetector()
 
     async def cog_unload(self):
         if self._session:
             await self._session.close()
+        await _audit_log.aclose()
 
     def get_session(self):
         if self._session is None or self._session.closed:
             self._session = aiohttp.ClientSession()
         return self._session
 
+    def matcher_for(self, guild_id: int) -> BlocklistMatcher:
+        matcher = self._matchers.get(guild_id)
+        if matcher is None:
+            terms = self.base_blocklist + load_mod_blocklists().get(str(guild_id), [])
+            matcher = self._matchers[guild_id] = BlocklistMatcher(set(terms))
+        return matcher
+
+    async def handle_spam(self, message: discord.Message, rule: str, action: str, first: bool, config: dict):
+        """Carry out an anti-spam verdict: the message always goes, the author is timed out once per episode"""
+        guild = message.guild
+        reason = f"Anti-spam: {rule}"
+        try:
+            if action != "off" and message.channel.permissions_for(guild.me).manage_messages:
+                await message.delete()
+        except (discord.NotFound, discord.Forbidden):
+            pass
+        except discord.HTTPException as e:
+            print(f"Anti-spam failed to delete a message: {e}")
+
+        if action == "lockdown" and self.spam_detector.begin_lockdown(guild.id, config):
+            minutes = config["lockdown_minutes"]
+            record_mod_action(guild.id, "lockdown", None, None, reason, f"{minutes} min, triggered in #{message.channel.name}")
+            embed = discord.Embed(
+                title="🔒 Raid Lockdown",
+                description=f"A raid was detected. For the next **{minutes}** minutes, new members who post are timed out.",
+                color=discord.Color.red(),
+                timestamp=datetime.now(timezone.utc)
+            )
+            try:
+                await message.channel.send(embed=embed)
+            except discord.HTTPException:
+                pass
+
+        if not first:
+            return
+        details = f"#{message.channel.name}: {message.content[:200]}"
+        if action != "delete":
+            try:
+                if guild.me.guild_permissions.moderate_members and message.author.top_role < guild.me.top_role:
+                    await message.author.timeout(timedelta(minutes=config["timeout_minutes"]), reason=reason)
+                    details = f"timed out {config['timeout_minutes']} min • {details}"
+            except discord.HTTPException as e:
+                print(f"Anti-spam failed to time out {message.author}: {e}")
+        record_mod_action(guild.id, "antispam", message.author.id, None, reason, details)
+
+    async def screen(self, guild_id: int, text: str) -> Optional[dict]:
+        """Run a message through the local stages, and the model only if they can't decide"""
+        if AI_MOD_FALLBACK == "allow" and get_breaker(HF_MOD_URL).is_open:
+            self.stage_hits["fallback"] += 1
+            return None
+        normalized = normalize_for_verdict(text)
+        term = self.matcher_for(guild_id).find(normalized)
+        if term is not None:
+            self.stage_hits["blocklist"] += 1
+            return {"flagged": True, "categories": {"blocklist": True}}
+        if is_trivial(normalized):
+            self.stage_hits["trivial"] += 1
+            return None
+        self.stage_hits["model"] += 1
+        return await self.batcher.check(text, normalized)
+
     @app_commands.command(name="ban", description="Ban a member from the server")
     @app_commands.guild_only()
     @app_commands.describe(member="Member to ban", reason="Reason for the ban", delete_days="Delete message history (0-7 days)")
@@ -125,6 +1280,7 @@ class Moderation(commands.Cog):
 
         try:
             await member.ban(reason=reason or f"Banned by {interaction.user}", delete_message_seconds=int(delete_days) * 86400)
+            record_mod_action(interaction.guild.id, "ban", member.id, interaction.user.id, reason, f"deleted {delete_days} days of messages")
             await interaction.response.send_message(embed=make_mod_embed(title="🔨 Member Banned", color=discord.Color.red(), user=member, moderator=interaction.user, reason=reason, extra_fields=[("Deleted Messages", f"{delete_days} days", True)]))
         except Exception as e:
             await interaction.response.send_message(f"❌ Ban failed: {e}", ephemeral=True)
@@ -149,6 +1305,7 @@ class Moderation(commands.Cog):
 
         try:
             await member.kick(reason=reason or f"Kicked by {interaction.user}")
+            record_mod_action(interaction.guild.id, "kick", member.id, interaction.user.id, reason)
             await interaction.response.send_message(embed=make_mod_embed(title="Member Kicked", color=discord.Color.orange(), user=member, moderator=interaction.user, reason=reason))
         except Exception as e:
             await interaction.response.send_message(f"❌ Kick failed: {e}", ephemeral=True)
@@ -174,6 +1331,7 @@ class Moderation(commands.Cog):
 
         try:
             await member.timeout(until, reason=reason or f"Timed out by {interaction.user}")
+            record_mod_action(interaction.guild.id, "timeout", member.id, interaction.user.id, reason, f"{int(minutes)} min")
             await interaction.response.send_message(embed=make_mod_embed(title="Member Timed Out", color=discord.Color.blurple(), user=member, moderator=interaction.user, reason=reason, extra_fields=[("Duration", f"{int(minutes)} minute(s)", True)]))
         except Exception as e:
             await interaction.response.send_message(f"❌ Timeout failed: {e}", ephemeral=True)
@@ -194,21 +1352,197 @@ class Moderation(commands.Cog):
 
         try:
             await member.timeout(None, reason=reason or f"Timeout cleared by {interaction.user}")
+            record_mod_action(interaction.guild.id, "untimeout", member.id, interaction.user.id, reason)
             await interaction.response.send_message(embed=make_mod_embed(title="Timeout Lifted", color=discord.Color.green(), user=member, moderator=interaction.user, reason=reason))
         except Exception as e:
             await interaction.response.send_message(f"❌ Failed: {e}", ephemeral=True)
 
-    @app_commands.command(name="purge", description="Delete a number of messages from this channel")
+    @app_commands.command(name="purge", description="Delete messages from this channel, optionally filtered")
     @app_commands.guild_only()
-    @app_commands.describe(amount="Number of messages to delete (1-100)")
+    @app_commands.describe(
+        amount=f"Number of matching messages to delete (1-{PURGE_MAX_MESSAGES})",
+        user="Only delete messages from this user",
+        pattern="Only delete messages matching this regular expression (case-insensitive)",
+        attachments_only="Only delete messages with attachments",
+        newer_than_minutes="Only delete messages sent in the last N minutes",
+        older_than_minutes="Only delete messages sent more than N minutes ago"
+    )
     @app_commands.checks.has_permissions(manage_messages=True)
-    async def purge(self, interaction: discord.Interaction, amount: app_commands.Range[int, 1, 100]):
+    async def purge(
+        self,
+        interaction: discord.Interaction,
+        amount: app_commands.Range[int, 1, PURGE_MAX_MESSAGES],
+        user: Optional[discord.User] = None,
+        pattern: Optional[str] = None,
+        attachments_only: bool = False,
+        newer_than_minutes: Optional[app_commands.Range[int, 1, 525600]] = None,
+        older_than_minutes: Optional[app_commands.Range[int, 1, 525600]] = None
+    ):
+        try:
+            regex = re.compile(pattern, re.IGNORECASE) if pattern else None
+        except re.error as e:
+            return await interaction.response.send_message(f"❌ Invalid pattern: {e}", ephemeral=True)
+
+        def check(message):
+            if user is not None and message.author.id != user.id:
+                return False
+            if attachments_only and not message.attachments:
+                return False
+            if regex is not None and not regex.search(message.content):
+                return False
+            return True
+
+        now = datetime.now(timezone.utc)
+        after = now - timedelta(minutes=newer_than_minutes) if newer_than_minutes else None
+        before = now - timedelta(minutes=older_than_minutes) if older_than_minutes else None
+
+        status = JobStatus(interaction)
+
+        async def show_progress(job):
+            await status.update(f"🧹 Purging... scanned **{job.scanned:,}**, deleted **{job.deleted:,}** of {job.matched:,} matched.")
+
         await interaction.response.defer(ephemeral=True)
+        job = PurgeJob(interaction.channel, amount, check, after=after, before=before, on_progress=show_progress)
+        try:
+            await job.run()
+        except Exception as e:
+            return await status.update(f"❌ Purge failed after deleting **{job.deleted:,}** messages: {e}")
+
+        record_mod_action(interaction.guild.id, "purge", user.id if user else None, interaction.user.id, None, f"{job.deleted:,} messages in #{interaction.channel.name}")
+        summary = f"✅ Deleted **{job.deleted:,}** messages (scanned {job.scanned:,})."
+        if job.single_deleted:
+            summary += f"\n{job.single_deleted:,} were older than 14 days and deleted one at a time."
+        if job.failed:
+            summary += f"\n⚠️ {job.failed:,} could not be deleted."
+        await status.update(summary)
+
+    @app_commands.command(name="mass_action", description="Ban, kick or timeout many members at once (raid cleanup)")
+    @app_commands.guild_only()
+    @app_commands.describe(
+        action="What to do to every matching member",
+        joined_within_minutes="Select members who joined in the last N minutes",
+        name_pattern="Select members whose name or display name matches this regular expression",
+        reason="Reason shown in the audit log and DMs",
+        timeout_minutes="Timeout duration when action is timeout (1-40320)",
+        notify="DM each member before acting"
+    )
+    @app_commands.choices(action=[
+        app_commands.Choice(name="Ban", value="ban"),
+        app_commands.Choice(name="Kick", value="kick"),
+        app_commands.Choice(name="Timeout", value="timeout")
+    ])
+    async def mass_action(
+        self,
+        interaction: discord.Interaction,
+        action: app_commands.Choice[str],
+        joined_within_minutes: Optional[app_commands.Range[int, 1, 10080]] = None,
+        name_pattern: Optional[str] = None,
+        reason: Optional[str] = None,
+        timeout_minutes: app_commands.Range[int, 1, 40320] = 60,
+        notify: bool = True
+    ):
+        permission = {"ban": "ban_members", "kick": "kick_members", "timeout": "moderate_members"}[action.value]
+        if not getattr(interaction.user.guild_permissions, permission):
+            return await interaction.response.send_message(f"❌ You need the `{permission}` permission for this.", ephemeral=True)
+        if joined_within_minutes is None and not name_pattern:
+            return await interaction.response.send_message("❌ Give `joined_within_minutes`, `name_pattern`, or both.", ephemeral=True)
         try:
-            deleted = await interaction.channel.purge(limit=amount)
-            await interaction.followup.send(f"✅ Deleted **{len(deleted)}** messages.", ephemeral=True)
+            regex = re.compile(name_pattern, re.IGNORECASE) if name_pattern else None
+        except re.error as e:
+            return await interaction.response.send_message(f"❌ Invalid pattern: {e}", ephemeral=True)
+
+        guild = interaction.guild
+        joined_after = datetime.now(timezone.utc) - timedelta(minutes=joined_within_minutes) if joined_within_minutes else None
+        is_owner = interaction.user.id == guild.owner_id
+        targets = []
+        for member in guild.members:
+            if member.id in (interaction.user.id, guild.owner_id, guild.me.id):
+                continue
+            if joined_after is not None and (member.joined_at is None or member.joined_at < joined_after):
+                continue
+            if regex is not None and not (regex.search(member.name) or regex.search(member.display_name)):
+                continue
+            # Same hierarchy rules as the single-member commands
+            if (not is_owner and interaction.user.top_role <= member.top_role) or guild.me.top_role <= member.top_role:
+                continue
+            targets.append(member)
+
+        if not targets:
+            return await interaction.response.send_message("No members match (members above you or the bot are skipped).", ephemeral=True)
+        if len(targets) > MASS_ACTION_MAX_TARGETS:
+            return await interaction.response.send_message(f"❌ {len(targets):,} members match; narrow it down to at most {MASS_ACTION_MAX_TARGETS:,}.", ephemeral=True)
+
+        preview = ", ".join(member.mention for member in targets[:20])
+        if len(targets) > 20:
+            preview += f" and {len(targets) - 20:,} more"
+        embed = discord.Embed(
+            title=f"⚠️ {action.name} {len(targets):,} members?",
+            description=preview,
+            color=discord.Color.red(),
+            timestamp=datetime.now(timezone.utc)
+        )
+        embed.add_field(name="Reason", value=reason or "No reason provided", inline=True)
+        if action.value == "timeout":
+            embed.add_field(name="Duration", value=f"{timeout_minutes} minute(s)", inline=True)
+        view = MassActionConfirmView(interaction.user.id)
+        await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
+        await view.wait()
+        if not view.confirmed:
+            if view.confirmed is None:
+                await interaction.edit_original_response(content="Timed out; nothing was done.", embed=None, view=None)
+            return
+
+        status = JobStatus(interaction)
+
+        async def show_progress(job):
+            await status.update(f"⏳ {action.name}: **{job.processed:,}** / {len(targets):,} done • {len(job.failures):,} failed • {job.throughput():.1f}/s")
+
+        job = MassActionJob(action.value, targets, interaction.user, reason=reason, timeout_minutes=timeout_minutes, notify=notify, on_progress=show_progress)
+        error = None
+        try:
+            await show_progress(job)
+            await job.run()
         except Exception as e:
-            await interaction.followup.send(f"❌ Purge failed: {e}", ephemeral=True)
+            # Still report what was done before it stopped
+            print(f"Mass {action.value} in {interaction.guild.id} stopped: {e!r}")
+            error = e
+
+        summary = discord.Embed(
+            title=f"Mass {action.name} {'Stopped' if error else 'Complete'}",
+            color=discord.Color.red() if error else discord.Color.green() if not job.failures else discord.Color.orange(),
+            timestamp=datetime.now(timezone.utc)
+        )
+        summary.add_field(name="Succeeded", value=f"**{job.succeeded:,}**", inline=True)
+        summary.add_field(name="Failed", value=f"**{len(job.failures):,}**", inline=True)
+        summary.add_field(name="Throughput", value=f"{job.throughput():.1f}/s", inline=True)
+        if notify:
+            summary.add_field(name="DMs Delivered", value=f"{job.dms_sent:,}", inline=True)
+        if job.failures:
+            summary.add_field(name="Failures", value="\n".join(f"{member.mention}: {failure[:80]}" for member, failure in job.failures[:10]), inline=False)
+        if error:
+            summary.add_field(name="Error", value=f"{error!r}"[:1024], inline=False)
+            summary.add_field(name="Not Attempted", value=f"{len(targets) - job.processed:,}", inline=True)
+        await status.update(embed=summary)
+
+    @app_commands.command(name="modlog", description="Browse the moderation log for this server")
+    @app_commands.guild_only()
+    @app_commands.checks.has_permissions(view_audit_log=True)
+    @app_commands.describe(user="Only show actions against this user", action="Only show this kind of action", days="Only show the last N days")
+    @app_commands.choices(action=[
+        app_commands.Choice(name=label, value=value) for value, label in MODLOG_ACTION_LABELS.items()
+    ])
+    async def modlog(
+        self,
+        interaction: discord.Interaction,
+        user: Optional[discord.User] = None,
+        action: Optional[app_commands.Choice[str]] = None,
+        days: Optional[app_commands.Range[int, 1, 3650]] = None
+    ):
+        await interaction.response.defer(ephemeral=True)
+        since = int(time.time()) - days * 86400 if days else None
+        view = ModLogView(interaction.user.id, interaction.guild, target=user, action=action.value if action else None, since=since)
+        embed = await view.load()
+        await interaction.followup.send(embed=embed, view=view)
 
     ai_mod = app_commands.Group(name="ai_mod", description="AI-powered moderation settings")
 
@@ -234,23 +1568,191 @@ class Moderation(commands.Cog):
         embed = discord.Embed(title="🤖 AI Moderation Status (Free HF Mode)", color=discord.Color.blue() if is_enabled else discord.Color.greyple())
         embed.add_field(name="Status", value=f"Currently **{status}**")
         embed.add_field(name="HF Configured", value="✅ Yes" if HUGGINGFACE_TOKEN else "❌ No (Missing HF Token)")
+        batcher = self.batcher
+        if batcher.requests_sent:
+            embed.add_field(name="Batching", value=f"{batcher.texts_checked:,} messages in {batcher.requests_sent:,} requests ({batcher.texts_checked / batcher.requests_sent:.1f} per request)", inline=False)
+        cache = batcher.cache
+        if cache.hits or cache.misses:
+            embed.add_field(name="Verdict Cache", value=f"{cache.hits:,} hits • {cache.misses:,} misses • {batcher.coalesced:,} joined an in-flight check • {len(cache):,} entries", inline=False)
+        screened = sum(self.stage_hits.values())
+        if screened:
+            stages = " • ".join(
+                f"{label}: {self.stage_hits[stage]:,} ({self.stage_hits[stage] / screened:.0%})"
+                for stage, label in (("blocklist", "Blocklist"), ("trivial", "Trivial"), ("model", "Model"), ("fallback", "Skipped (API down)"))
+            )
+            embed.add_field(name="Screening Stages", value=stages, inline=False)
+        breaker = get_breaker(HF_MOD_URL)
+        p95 = breaker.latency_p95()
+        embed.add_field(
+            name="Moderation API",
+            value=(
+                f"Circuit **{breaker.state.replace('_', '-')}** • {breaker.error_rate():.0%} recent errors • "
+                f"p95 {f'{p95 * 1000:.0f} ms' if p95 is not None else 'n/a'} • timeout {breaker.timeout():.1f}s\n"
+                f"{batcher.failed_fast:,} checks failed fast • fallback: **{AI_MOD_FALLBACK}**"
+            ),
+            inline=False
+        )
+        guild_terms = load_mod_blocklists().get(str(interaction.guild.id), [])
+        embed.add_field(name="Blocklist", value=f"{len(self.base_blocklist):,} base terms + {len(guild_terms):,} server terms", inline=False)
         await interaction.followup.send(embed=embed)
 
+    @ai_mod.command(name="blocklist_add", description="Block a word or phrase in this server")
+    @app_commands.guild_only()
+    @app_commands.describe(term="Word or phrase to delete on sight")
+    @app_commands.checks.has_permissions(manage_guild=True)
+    async def ai_mod_blocklist_add(self, interaction: discord.Interaction, term: str):
+        normalized = normalize_for_verdict(term)
+        if not normalized:
+            return await interaction.response.send_message("❌ That term is empty.", ephemeral=True)
+        blocklists = load_mod_blocklists()
+        terms = blocklists.setdefault(str(interaction.guild.id), [])
+        if normalized in terms:
+            return await interaction.response.send_message("That term is already blocked.", ephemeral=True)
+        if len(terms) >= MOD_BLOCKLIST_MAX_TERMS:
+            return await interaction.response.send_message(f"❌ A server can block at most {MOD_BLOCKLIST_MAX_TERMS} terms.", ephemeral=True)
+        terms.append(normalized)
+        save_mod_blocklists(blocklists)
+        self._matchers.pop(interaction.guild.id, None)
+        await interaction.response.send_message(f"✅ Blocked `{normalized}`.", ephemeral=True)
+
+    @ai_mod.command(name="blocklist_remove", description="Unblock a word or phrase in this server")
+    @app_commands.guild_only()
+    @app_commands.describe(term="Word or phrase to unblock")
+    @app_commands.checks.has_permissions(manage_guild=True)
+    async def ai_mod_blocklist_remove(self, interaction: discord.Interaction, term: str):
+        normalized = normalize_for_verdict(term)
+        blocklists = load_mod_blocklists()
+        terms = blocklists.get(str(interaction.guild.id), [])
+        if normalized not in terms:
+            return await interaction.response.send_message("That term is not on this server's blocklist.", ephemeral=True)
+        terms.remove(normalized)
+        save_mod_blocklists(blocklists)
+        self._matchers.pop(interaction.guild.id, None)
+        await interaction.response.send_message(f"✅ Unblocked `{normalized}`.", ephemeral=True)
+
+    antispam = app_commands.Group(name="antispam", description="Spam and raid protection settings")
+
+    @antispam.command(name="toggle", description="Turn spam and raid protection on or off for this server")
+    @app_commands.guild_only()
+    @app_commands.checks.has_permissions(manage_guild=True)
+    async def antispam_toggle(self, interaction: discord.Interaction, enabled: bool):
+        configs = load_antispam_configs()
+        configs.setdefault(str(interaction.guild.id), {})["enabled"] = enabled
+        save_antispam_configs(configs)
+        self.spam_detector.reset(interaction.guild.id)
+        status = "enabled" if enabled else "disabled"
+        await interaction.response.send_message(f"✅ Anti-spam has been **{status}** for this server.", ephemeral=True)
+
+    @antispam.command(name="rule", description="Change what a spam rule reacts to and what it does")
+    @app_commands.guild_only()
+    @app_commands.checks.has_permissions(manage_guild=True)
+    @app_commands.describe(
+        rule="Which rule to change",
+        action="What to do when it triggers (lockdown also times out new members who post)",
+        threshold="Messages (mentions, for mention spam) within the window that trigger it",
+        seconds="Length of the window in seconds",
+        joins="Raid only: joins within the join window that arm the rule"
+    )
+    @app_commands.choices(
+        rule=[
+            app_commands.Choice(name="Message flood", value="flood"),
+            app_commands.Choice(name="Duplicate messages", value="duplicates"),
+            app_commands.Choice(name="Mention spam", value="mentions"),
+            app_commands.Choice(name="Join-then-post raid", value="raid")
+        ],
+        action=[app_commands.Choice(name=action.capitalize(), value=action) for action in ANTISPAM_ACTIONS]
+    )
+    async def antispam_rule(
+        self,
+        interaction: discord.Interaction,
+        rule: app_commands.Choice[str],
+        action: Optional[app_commands.Choice[str]] = None,
+        threshold: Optional[app_commands.Range[int, 2, 500]] = None,
+        seconds: Optional[app_commands.Range[int, 1, 600]] = None,
+        joins: Optional[app_commands.Range[int, 2, 500]] = None
+    ):
+        changes = {"action": action.value if action else None, "threshold": threshold, "seconds": seconds}
+        if rule.value == "raid":
+            changes["joins"] = joins
+        changes = {key: value for key, value in changes.items() if value is not None}
+        if not changes:
+            return await interaction.response.send_message("❌ Nothing to change.", ephemeral=True)
+        configs = load_antispam_configs()
+        guild_config = configs.setdefault(str(interaction.guild.id), {})
+        guild_config.setdefault("rules", {}).setdefault(rule.value, {}).update(changes)
+        save_antispam_configs(configs)
+        self.spam_detector.reset(interaction.guild.id)
+        settings = antispam_config_for(interaction.guild.id)["rules"][rule.value]
+        await interaction.response.send_message(
+            f"✅ **{rule.name}**: {settings['action']} at {settings['threshold']} within {settings['seconds']}s.",
+            ephemeral=True
+        )
+
+    @antispam.command(name="status", description="Show spam and raid protection settings")
+    @app_commands.guild_only()
+    async def antispam_status(self, interaction: discord.Interaction):
+        config = antispam_config_for(interaction.guild.id)
+        embed = discord.Embed(
+            title="🚫 Anti-Spam Status",
+            color=discord.Color.blue() if config["enabled"] else discord.Color.greyple()
+        )
+        embed.add_field(name="Status", value=f"Currently **{'enabled' if config['enabled'] else 'disabled'}**")
+        if self.spam_detector.in_lockdown(interaction.guild.id):
+            embed.add_field(name="Lockdown", value="🔒 **Active**")
+        rules = config["rules"]
+        lines = [
+            f"**Flood:** {rules['flood']['action']} at {rules['flood']['threshold']} messages / {rules['flood']['seconds']}s",
+            f"**Duplicates:** {rules['duplicates']['action']} at {rules['duplicates']['threshold']} repeats / {rules['duplicates']['seconds']}s",
+            f"**Mentions:** {rules['mentions']['action']} at {rules['mentions']['threshold']} mentions / {rules['mentions']['seconds']}s",
+            f"**Raid:** {rules['raid']['action']} at {rules['raid']['threshold']} new-member messages / {rules['raid']['seconds']}s "
+            f"after {rules['raid']['joins']} joins / {rules['raid']['join_seconds']}s",
+        ]
+        embed.add_field(name="Rules", value="\n".join(lines), inline=False)
+        embed.add_field(
+            name="Actions",
+            value=f"Timeout {config['timeout_minutes']} min • lockdown {config['lockdown_minutes']} min • new member = joined < {config['new_member_minutes']} min ago",
+            inline=False
+        )
+        triggered = self.spam_detector.triggered
+        if triggered:
+            embed.add_field(name="Triggered (all servers)", value=" • ".join(f"{rule}: {count:,}" for rule, count in triggered.most_common()), inline=False)
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    @commands.Cog.listener()
+    async def on_member_join(self, member: discord.Member):
+        antispam = antispam_config_for(member.guild.id)
+        if antispam["enabled"]:
+            self.spam_detector.record_join(member.guild.id, antispam)
+
     @commands.Cog.listener()
     async def on_message(self, message: discord.Message):
         if message.author.bot or not message.guild:
             return
-        
-        configs = load_ai_mod_configs()
-        guild_id_str = str(message.guild.id)
-        if not configs.get(guild_id_str, False):
-            return
 
         # Skip moderation for users with manage_messages permission
         if message.author.guild_permissions.manage_messages:
             return
 
-        result = await check_moderation(message.content, self.get_session())
+        antispam = antispam_config_for(message.guild.id)
+        if antispam["enabled"]:
+            joined_at = getattr(message.author, "joined_at", None)
+            verdict = self.spam_detector.check(
+                message.guild.id,
+                message.author.id,
+                message.content,
+                len(message.mentions) + len(message.role_mentions),
+                joined_at.timestamp() if joined_at else None,
+                antispam
+            )
+            if verdict:
+                return await self.handle_spam(message, *verdict, antispam)
+
+        configs = load_ai_mod_configs()
+        guild_id_str = str(message.guild.id)
+        if not configs.get(guild_id_str, False):
+            return
+
+        result = await self.screen(message.guild.id, message.content)
 
         if result and result.get("flagged"):
             categories = [cat for cat, val in result.get("categories", {}).items() if val]
@@ -261,6 +1763,7 @@ class Moderation(commands.Cog):
                     return
 
                 await message.delete()
+                record_mod_action(message.guild.id, "ai_delete", message.author.id, None, reason, f"#{message.channel.name}: {message.content[:200]}")
                 
                 # Notify in channel
                 embed = discord.Embed(
@@ -1,22 +1,471 @@
 import discord
 from discord import app_commands
-from discord.ext import commands
+from discord.ext import commands, tasks
 import json
 import asyncio
+import math
+import os
+import re
+import time
+import zlib
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 from deep_translator import GoogleTranslator
 
 TRANSLATE_CONFIG_FILE = "translate_configs.json"
+# Guild ID -> translation backend name, for guilds not using TRANSLATE_BACKEND
+TRANSLATE_BACKEND_FILE = "translate_backends.json"
+TRANSLATE_BACKEND = os.getenv("TRANSLATE_BACKEND", "google").lower()
 
-def load_translate_configs():
+# The local backend is a deterministic stand-in for benchmarks and offline tests
+LOCAL_TRANSLATOR_LATENCY_MS = float(os.getenv("LOCAL_TRANSLATOR_LATENCY_MS", "50"))
+LOCAL_TRANSLATOR_FAILURE_RATE = float(os.getenv("LOCAL_TRANSLATOR_FAILURE_RATE", "0"))
+
+# Translation result cache; set TRANSLATE_CACHE_PERSIST=true to keep it across restarts
+TRANSLATE_CACHE_FILE = "translate_cache.json"
+TRANSLATE_CACHE_PERSIST = os.getenv("TRANSLATE_CACHE_PERSIST", "false").lower() == "true"
+TRANSLATE_CACHE_MAX_ENTRIES = 5000
+TRANSLATE_CACHE_TTL_SECONDS = 24 * 60 * 60
+
+# Messages arriving in a channel within this window are translated together
+# and posted as one embed
+TRANSLATE_BATCH_WINDOW_MS = 500
+TRANSLATE_BATCH_MAX_MESSAGES = 10
+# Languages one channel can be translated into at once
+TRANSLATE_MAX_TARGETS = 5
+# Google rejects requests over 5000 characters
+TRANSLATE_BATCH_MAX_CHARS = 4500
+TRANSLATE_BATCH_SEPARATOR = "\n###\n"
+_BATCH_SPLIT = re.compile(r"\s*###\s*")
+
+# Translator calls get their own threads so they can't starve (or be starved
+# by) other executor users. Past TRANSLATE_QUEUE_MAX waiting jobs, the busiest
+# channel's oldest job is dropped.
+TRANSLATE_WORKERS = 4
+TRANSLATE_QUEUE_MAX = 200
+TRANSLATE_WAIT_SAMPLES = 1000
+
+# Offline language identification, used to skip messages that are already in
+# the target language. Latin-script languages are told apart with character
+# n-gram models built from the sample texts in LANGID_PROFILE_DIR.
+LANGID_PROFILE_DIR = os.path.join("assets", "langid")
+LANGID_MIN_LETTERS = 12
+LANGID_MIN_CONFIDENCE = 0.9
+# Open-set rejection: text in a language we have no model for (Dutch,
+# Turkish, Polish...) still has a "best" model, so the winner must also know
+# most of the text's words and trigrams before we call it
+LANGID_MIN_KNOWN_WORDS = 0.55
+LANGID_MAX_UNSEEN_TRIGRAMS = 0.25
+
+# Channel ID (int) -> config. Loaded from disk once; on_message only does a
+# dict lookup, and /translate_setup edits the table in place and saves it in
+# the background.
+_translate_configs = None
+_translate_backends = None
+_dirty_files = set()
+_save_task = None
+
+def _load_id_table(path):
     try:
-        with open(TRANSLATE_CONFIG_FILE, 'r') as f:
-            return json.load(f)
-    except FileNotFoundError:
+        with open(path, 'r') as f:
+            data = json.load(f)
+        return {int(key): value for key, value in data.items()} if isinstance(data, dict) else {}
+    except (FileNotFoundError, json.JSONDecodeError, ValueError):
         return {}
 
-def save_translate_configs(configs):
-    with open(TRANSLATE_CONFIG_FILE, 'w') as f:
-        json.dump(configs, f, indent=2)
+def load_translate_configs():
+    global _translate_configs
+    if _translate_configs is None:
+        _translate_configs = _load_id_table(TRANSLATE_CONFIG_FILE)
+    return _translate_configs
+
+def load_translate_backends():
+    global _translate_backends
+    if _translate_backends is None:
+        _translate_backends = _load_id_table(TRANSLATE_BACKEND_FILE)
+    return _translate_backends
+
+def config_targets(config):
+    """The target languages of a channel config, as a list of {target_lang, target_name}.
+
+    Configs saved before multi-language support hold a single target inline.
+    """
+    return config.get("targets") or [config]
+
+def _atomic_write(path, data):
+    # Write a temp file and swap it in, so a crash never leaves half a file
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+async def _flush_dirty_files():
+    while _dirty_files:
+        path = _dirty_files.pop()
+        table = _translate_configs if path == TRANSLATE_CONFIG_FILE else _translate_backends
+        # Serialize on the event loop so the snapshot can't change mid-dump
+        data = json.dumps({str(key): value for key, value in table.items()}, indent=2)
+        try:
+            await asyncio.to_thread(_atomic_write, path, data)
+        except OSError as e:
+            print(f"Failed to save {path}: {e}")
+
+def _schedule_save(path):
+    global _save_task
+    _dirty_files.add(path)
+    if _save_task is None or _save_task.done():
+        _save_task = asyncio.create_task(_flush_dirty_files())
+
+def save_translate_configs():
+    """Persist the routing table in the background; bursts of changes collapse into one write"""
+    _schedule_save(TRANSLATE_CONFIG_FILE)
+
+def save_translate_backends():
+    _schedule_save(TRANSLATE_BACKEND_FILE)
+
+class TranslationBackend:
+    """A translation provider. translate() blocks, so it runs on the translation pool."""
+
+    name = None
+    label = None
+
+    def translate(self, text, target_lang):
+        raise NotImplementedError
+
+class GoogleBackend(TranslationBackend):
+    name = "google"
+    label = "Google Translate"
+
+    def translate(self, text, target_lang):
+        return GoogleTranslator(source='auto', target=target_lang).translate(text)
+
+class LocalBackend(TranslationBackend):
+    """Offline stand-in that reverses every word.
+
+    The same input always gives the same output and the same success or
+    failure, so load tests are reproducible without network access.
+    """
+
+    name = "local"
+    label = "Local (test)"
+
+    def __init__(self, latency_ms=LOCAL_TRANSLATOR_LATENCY_MS, failure_rate=LOCAL_TRANSLATOR_FAILURE_RATE):
+        self.latency_ms = latency_ms
+        self.failure_rate = failure_rate
+
+    def translate(self, text, target_lang):
+        time.sleep(self.latency_ms / 1000)
+        if zlib.crc32(f"{target_lang}:{text}".encode()) % 10000 < self.failure_rate * 10000:
+            raise RuntimeError("Local translator failure (simulated)")
+        return _WORD.sub(lambda match: match.group(0)[::-1], text)
+
+TRANSLATION_BACKENDS = {backend.name: backend for backend in (GoogleBackend(), LocalBackend())}
+
+def normalize_text(text):
+    """Collapse whitespace so trivially different repeats share a cache entry"""
+    return " ".join(text.split())
+
+def is_untranslated(text, translation):
+    """True if the backend handed `text` back unchanged"""
+    return normalize_text(translation).lower() == normalize_text(text).lower()
+
+class TranslationCache:
+    """LRU cache of translations keyed by (backend, target language, normalized text).
+
+    Expiry uses wall-clock time so entries loaded from disk keep their age.
+    """
+
+    def __init__(self, max_entries=TRANSLATE_CACHE_MAX_ENTRIES, ttl=TRANSLATE_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.dirty = False
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, backend, target, text):
+        key = (backend, target, normalize_text(text))
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] > time.time():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            del self._entries[key]
+        self.misses += 1
+        return None
+
+    def put(self, backend, target, text, translation):
+        key = (backend, target, normalize_text(text))
+        self._entries[key] = (time.time() + self.ttl, translation)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        self.dirty = True
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def dumps(self):
+        now = time.time()
+        return json.dumps([
+            [backend, target, text, expires, translation]
+            for (backend, target, text), (expires, translation) in self._entries.items()
+            if expires > now
+        ])
+
+    def load(self, path):
+        try:
+            with open(path, 'r') as f:
+                rows = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+        now = time.time()
+        # Rows were saved least recently used first, so the LRU order survives
+        for row in rows[-self.max_entries:]:
+            # Skip rows from older cache formats
+            if len(row) == 5 and row[3] > now:
+                backend, target, text, expires, translation = row
+                self._entries[(backend, target, text)] = (expires, translation)
+
+class TranslationOverloaded(Exception):
+    """A queued translation was dropped to make room for newer ones"""
+
+class TranslationPool:
+    """Dedicated worker threads for blocking translator calls.
+
+    Jobs queue per channel and workers take channels round-robin, so one busy
+    channel can't hold up the others.
+    """
+
+    def __init__(self, workers=TRANSLATE_WORKERS, max_queued=TRANSLATE_QUEUE_MAX):
+        self.workers = workers
+        self.max_queued = max_queued
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="translate")
+        # Channel ID -> deque of (enqueued at, future, func)
+        self._queues = {}
+        # Channels with queued jobs, in the order they will be served
+        self._order = deque()
+        self._available = asyncio.Semaphore(0)
+        self._tasks = []
+        self.depth = 0
+        self.peak_depth = 0
+        self.dropped = 0
+        self._waits = deque(maxlen=TRANSLATE_WAIT_SAMPLES)
+
+    def start(self):
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    def close(self):
+        for task in self._tasks:
+            task.cancel()
+        self._executor.shutdown(wait=False)
+
+    async def run(self, channel_id, func):
+        """Run `func` on a translation thread, queued behind `channel_id`'s earlier jobs"""
+        if self.depth >= self.max_queued:
+            self._drop_oldest()
+        future = asyncio.get_running_loop().create_future()
+        queue = self._queues.get(channel_id)
+        if queue is None:
+            queue = self._queues[channel_id] = deque()
+            self._order.append(channel_id)
+        queue.append((time.monotonic(), future, func))
+        self.depth += 1
+        self.peak_depth = max(self.peak_depth, self.depth)
+        self._available.release()
+        return await future
+
+    def _drop_oldest(self):
+        channel_id = max(self._queues, key=lambda channel_id: len(self._queues[channel_id]))
+        queue = self._queues[channel_id]
+        _, future, _ = queue.popleft()
+        if not queue:
+            del self._queues[channel_id]
+            self._order.remove(channel_id)
+        self.depth -= 1
+        self.dropped += 1
+        if not future.done():
+            future.set_exception(TranslationOverloaded())
+
+    def _next_job(self):
+        if not self._order:
+            return None
+        channel_id = self._order.popleft()
+        queue = self._queues[channel_id]
+        job = queue.popleft()
+        if queue:
+            self._order.append(channel_id)
+        else:
+            del self._queues[channel_id]
+        self.depth -= 1
+        return job
+
+    async def _work(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._available.acquire()
+            job = self._next_job()
+            # Dropped jobs leave a spare wakeup behind
+            if job is None:
+                continue
+            enqueued_at, future, func = job
+            if future.done():
+                continue
+            self._waits.append(time.monotonic() - enqueued_at)
+            try:
+                result = await loop.run_in_executor(self._executor, func)
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                if not future.done():
+                    future.set_result(result)
+
+    def wait_percentile(self, pct):
+        """Queue wait in seconds over the last TRANSLATE_WAIT_SAMPLES jobs"""
+        if not self._waits:
+            return 0.0
+        ordered = sorted(self._waits)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+# Parts of a message that never need translating
+_UNTRANSLATABLE = re.compile(
+    r"```.*?```"                      # code blocks
+    r"|`[^`]*`"                       # inline code
+    r"|https?://\S+"                  # links
+    r"|<(?:@[!&]?|#)\d+>"              # user, role and channel mentions
+    r"|<a?:\w+:\d+>"                  # custom emoji
+    r"|@(?:everyone|here)",
+    re.DOTALL,
+)
+_WORD = re.compile(r"[^\W\d_]+")
+
+def translatable_text(content):
+    """The part of a message worth translating, or "" if it is only links, mentions, emoji or code"""
+    text = _UNTRANSLATABLE.sub(" ", content)
+    return text if _WORD.search(text) else ""
+
+# Non-Latin scripts: (first, last code point, script)
+_SCRIPT_RANGES = [
+    (0x3040, 0x30FF, "kana"),
+    (0x1100, 0x11FF, "hangul"),   # jamo
+    (0x3130, 0x318F, "hangul"),
+    (0xAC00, 0xD7AF, "hangul"),   # syllables
+    (0x4E00, 0x9FFF, "han"),
+    (0x0600, 0x06FF, "arabic"),
+    (0x0400, 0x04FF, "cyrillic"),
+]
+# Kana and hangul belong to one language each
+_SCRIPT_ONLY_LANGUAGE = {"kana": "ja", "hangul": "ko"}
+# Shared scripts only decide the language with evidence: (language, letters
+# or common words it uses that its script-mates don't, letters only its
+# script-mates use). Cyrillic could be Ukrainian or Kazakh, Arabic script
+# Persian or Urdu, and ideographs alone could be Japanese.
+_SCRIPT_EVIDENCE = {
+    "cyrillic": (
+        "ru",
+        set("ыэъё") | {"что", "это", "очень", "когда", "только", "если", "уже", "сейчас", "сегодня", "можно", "нужно", "почему", "здесь", "хорошо", "спасибо", "привет"},
+        set("іїєґўјљњђћџѓќѕәғқңөұүһ"),
+    ),
+    "arabic": ("ar", set("ةيكى"), set("پچژگکیۀٹڈڑںےھۆێڕڵ")),
+    "han": ("zh-cn", set("们这说个时为没对还过问么吗呢边让给谁"), set()),
+}
+
+def _script_language(words):
+    """(script, language) for mostly non-Latin text, else (None, None); language is None if undecided"""
+    letters = "".join(words)
+    counts = Counter()
+    for ch in letters:
+        cp = ord(ch)
+        for first, last, script in _SCRIPT_RANGES:
+            if first <= cp <= last:
+                counts[script] += 1
+                break
+    if not counts:
+        return None, None
+    # Japanese mixes kanji into kana text, so any kana outweighs the ideographs
+    if counts["kana"] and counts["han"]:
+        counts["kana"] += counts.pop("han")
+    script, count = counts.most_common(1)[0]
+    if count * 2 < len(letters):
+        return None, None
+    if script in _SCRIPT_ONLY_LANGUAGE:
+        return script, _SCRIPT_ONLY_LANGUAGE[script]
+    code, markers, foreign = _SCRIPT_EVIDENCE[script]
+    present = set(letters) | set(words)
+    return script, code if present & markers and not present & foreign else None
+
+class LanguageIdentifier:
+    """Guesses a message's language without a network call.
+
+    Kana and hangul decide it outright, other non-Latin scripts only with
+    letters specific to one language. Latin text is scored against naive
+    Bayes models of 1-3 character n-grams, and the winner is only trusted if
+    it knows most of the text; otherwise the answer is None ("don't know").
+    """
+
+    def __init__(self, profile_dir=LANGID_PROFILE_DIR):
+        self.models = {}
+        try:
+            filenames = sorted(os.listdir(profile_dir))
+        except FileNotFoundError:
+            print(f"Language profiles not found in {profile_dir}; detection limited to script")
+            filenames = []
+        for filename in filenames:
+            if filename.endswith(".txt"):
+                with open(os.path.join(profile_dir, filename), 'r', encoding='utf-8') as f:
+                    self.models[filename[:-4]] = self._train(f.read())
+
+    @staticmethod
+    def _ngrams(text):
+        for word in _WORD.findall(text.lower()):
+            padded = f" {word} "
+            for n in (1, 2, 3):
+                for i in range(len(padded) - n + 1):
+                    yield padded[i:i + n]
+
+    def _train(self, text):
+        counts = Counter(self._ngrams(text))
+        denominator = sum(counts.values()) + len(counts) + 1
+        log_probs = {gram: math.log((count + 1) / denominator) for gram, count in counts.items()}
+        vocabulary = {word.lower() for word in _WORD.findall(text)}
+        return log_probs, math.log(1 / denominator), vocabulary
+
+    def detect(self, text):
+        """Return a LANGUAGES code, or None if the text is too short or ambiguous to call"""
+        words = [word.lower() for word in _WORD.findall(text)]
+        script, code = _script_language(words)
+        if script is not None:
+            return code
+        letters = "".join(words)
+        if len(letters) < LANGID_MIN_LETTERS or not self.models:
+            return None
+
+        grams = Counter(self._ngrams(text))
+        scores = {}
+        for code, (log_probs, unseen, _) in self.models.items():
+            scores[code] = sum(log_probs.get(gram, unseen) * count for gram, count in grams.items())
+        best = max(scores, key=scores.get)
+        # Softmax over the scores gives the winner's share of the probability
+        total = sum(math.exp(score - scores[best]) for score in scores.values())
+        if 1 / total < LANGID_MIN_CONFIDENCE:
+            return None
+
+        # The softmax only ranks our own models; check the winner actually fits
+        log_probs, _, vocabulary = self.models[best]
+        known_words = sum(word in vocabulary for word in words) / len(words)
+        trigrams = [(gram, count) for gram, count in grams.items() if len(gram) == 3]
+        unseen_trigrams = sum(count for gram, count in trigrams if gram not in log_probs) / max(1, sum(count for _, count in trigrams))
+        if known_words < LANGID_MIN_KNOWN_WORDS or unseen_trigrams > LANGID_MAX_UNSEEN_TRIGRAMS:
+            return None
+        return best
 
 LANGUAGES = {
     "English": "en",
@@ -35,71 +484,300 @@ LANGUAGES = {
 class Translation(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
+        self.configs = load_translate_configs()
+        self.guild_backends = load_translate_backends()
+        self.cache = TranslationCache()
+        self.api_calls = 0
+        self.langid = LanguageIdentifier()
+        self.skipped_untranslatable = 0
+        self.skipped_same_language = 0
+        # Channel ID -> messages waiting for the current batch window to close
+        self._batches = {}
+        self.pool = TranslationPool()
+        if TRANSLATE_CACHE_PERSIST:
+            self.cache.load(TRANSLATE_CACHE_FILE)
+            self.save_cache.start()
+
+    async def cog_load(self):
+        self.pool.start()
+
+    async def cog_unload(self):
+        self.pool.close()
+        if _save_task is not None:
+            await _save_task
+        if TRANSLATE_CACHE_PERSIST:
+            self.save_cache.cancel()
+            await self._save_cache()
+
+    async def _save_cache(self):
+        if not self.cache.dirty:
+            return
+        self.cache.dirty = False
+        try:
+            await asyncio.to_thread(_atomic_write, TRANSLATE_CACHE_FILE, self.cache.dumps())
+        except OSError as e:
+            print(f"Failed to save translation cache: {e}")
+
+    @tasks.loop(minutes=10)
+    async def save_cache(self):
+        await self._save_cache()
+
+    def backend_for(self, guild_id):
+        name = self.guild_backends.get(guild_id, TRANSLATE_BACKEND)
+        return TRANSLATION_BACKENDS.get(name, TRANSLATION_BACKENDS["google"])
+
+    async def _call_translator(self, backend, text, target_lang, channel_id=None):
+        self.api_calls += 1
+        return await self.pool.run(channel_id, lambda: backend.translate(text, target_lang))
+
+    async def _translate_chunk(self, backend, texts, target_lang, channel_id=None):
+        if len(texts) == 1:
+            return [await self._call_translator(backend, texts[0], target_lang, channel_id)]
+        joined = await self._call_translator(backend, TRANSLATE_BATCH_SEPARATOR.join(texts), target_lang, channel_id)
+        parts = _BATCH_SPLIT.split(joined.strip()) if joined else []
+        if len(parts) != len(texts):
+            # The separator didn't survive translation; fall back to one call each
+            return await asyncio.gather(*(self._call_translator(backend, text, target_lang, channel_id) for text in texts))
+        return parts
+
+    async def translate_many(self, texts, target_lang, channel_id=None, backend=None, sources=None):
+        """Translate several texts, answering repeats from the cache and the rest in as few calls as possible.
+
+        The backend detects one source language per call, so only texts in the
+        same language share one. `sources` gives each text's detected language
+        if the caller already knows it.
+        """
+        backend = backend or self.backend_for(None)
+        results = [self.cache.get(backend.name, target_lang, text) for text in texts]
+        chunks, open_chunks = [], {}
+        for i, text in enumerate(texts):
+            if results[i] is not None:
+                continue
+            source = sources[i] if sources is not None else self.langid.detect(text)
+            if source is None:
+                # Can't tell what language it is, so it can't share a call
+                chunks.append([i])
+                continue
+            chunk, size = open_chunks.get(source, ([], 0))
+            if chunk and size + len(text) + len(TRANSLATE_BATCH_SEPARATOR) > TRANSLATE_BATCH_MAX_CHARS:
+                chunks.append(chunk)
+                chunk, size = [], 0
+            chunk.append(i)
+            open_chunks[source] = (chunk, size + len(text) + len(TRANSLATE_BATCH_SEPARATOR))
+        chunks.extend(chunk for chunk, _ in open_chunks.values())
+
+        translated = await asyncio.gather(*(self._translate_chunk(backend, [texts[i] for i in chunk], target_lang, channel_id) for chunk in chunks))
+        for chunk, translations in zip(chunks, translated):
+            for i, translation in zip(chunk, translations):
+                results[i] = translation
+                # An unchanged text wasn't translated; a later call may do better
+                if translation and not is_untranslated(texts[i], translation):
+                    self.cache.put(backend.name, target_lang, texts[i], translation)
+        return results
+
+    async def translate(self, text, target_lang, channel_id=None, backend=None):
+        """Translate `text`, answering repeats from the cache"""
+        return (await self.translate_many([text], target_lang, channel_id, backend, sources=[None]))[0]
 
     @commands.Cog.listener()
     async def on_message(self, message: discord.Message):
-        if message.author.bot:
+        config = self.configs.get(message.channel.id)
+        if config is None or message.author.bot:
             return
 
-        configs = load_translate_configs()
-        channel_id = str(message.channel.id)
+        text = translatable_text(message.content)
+        if not text:
+            self.skipped_untranslatable += 1
+            return
+        # Detected once and shared by every target language
+        source = self.langid.detect(text)
+        if all(target["target_lang"] == source for target in config_targets(config)):
+            self.skipped_same_language += 1
+            return
 
-        if channel_id in configs:
-            config = configs[channel_id]
-            target_lang = config["target_lang"]
+        batch = self._batches.get(message.channel.id)
+        if batch is None:
+            batch = self._batches[message.channel.id] = []
+            asyncio.create_task(self._flush_after_window(message.channel, batch))
+        batch.append((message, source))
+        if len(batch) >= TRANSLATE_BATCH_MAX_MESSAGES:
+            del self._batches[message.channel.id]
+            asyncio.create_task(self._post_translations(message.channel, batch))
 
-            if not message.content.strip():
-                return
+    async def _flush_after_window(self, channel, batch):
+        await asyncio.sleep(TRANSLATE_BATCH_WINDOW_MS / 1000)
+        # A full batch is flushed early and replaced, so only flush our own
+        if self._batches.get(channel.id) is batch:
+            del self._batches[channel.id]
+            await self._post_translations(channel, batch)
 
-            try:
-                loop = asyncio.get_event_loop()
-                translation = await loop.run_in_executor(
-                    None, 
-                    lambda: GoogleTranslator(source='auto', target=target_lang).translate(message.content)
-                )
-
-                if translation and translation.strip().lower() != message.content.strip().lower():
-                    embed = discord.Embed(
-                        description=translation,
-                        color=discord.Color.blue()
-                    )
-                    embed.set_author(name=f"{message.author.display_name} (Translated to {config['target_name']})", icon_url=message.author.display_avatar.url)
-                    await message.channel.send(embed=embed)
-            except Exception as e:
-                print(f"Translation error in channel {channel_id}: {e}")
+    async def _translate_for_target(self, batch, target, channel_id, backend):
+        # Messages already in this target's language don't need a call
+        indices = [i for i, (_, source) in enumerate(batch) if source != target["target_lang"]]
+        translations = await self.translate_many([batch[i][0].content for i in indices], target["target_lang"], channel_id, backend, [batch[i][1] for i in indices])
+        results = [None] * len(batch)
+        for i, translation in zip(indices, translations):
+            if translation and not is_untranslated(batch[i][0].content, translation):
+                results[i] = translation
+        return results
+
+    async def _post_translations(self, channel, batch):
+        config = self.configs.get(channel.id)
+        if config is None:
+            return
+
+        targets = config_targets(config)
+        guild = getattr(channel, "guild", None)
+        backend = self.backend_for(guild.id if guild else None)
+        try:
+            per_target = await asyncio.gather(*(self._translate_for_target(batch, target, channel.id, backend) for target in targets))
+            if len(targets) == 1:
+                await self._post_single_target(channel, batch, per_target[0], targets[0])
+            else:
+                await self._post_multi_target(channel, batch, per_target, targets)
+        except TranslationOverloaded:
+            # Shed under load; counted in the pool's drop metric
+            pass
+        except Exception as e:
+            print(f"Translation error in channel {channel.id}: {e}")
+
+    async def _post_single_target(self, channel, batch, translations, target):
+        lines = [(message.author, translation) for (message, _), translation in zip(batch, translations) if translation]
+        if not lines:
+            return
+
+        if len(lines) == 1:
+            author, translation = lines[0]
+            embed = discord.Embed(
+                description=translation,
+                color=discord.Color.blue()
+            )
+            embed.set_author(name=f"{author.display_name} (Translated to {target['target_name']})", icon_url=author.display_avatar.url)
+            await channel.send(embed=embed)
+            return
+
+        # One embed for the whole batch, split only if it outgrows Discord's description limit
+        description = ""
+        for author, translation in lines:
+            line = f"**{author.display_name}:** {translation}\n"[:4096]
+            if len(description) + len(line) > 4096:
+                await channel.send(embed=self._batch_embed(description, target))
+                description = ""
+            description += line
+        await channel.send(embed=self._batch_embed(description, target))
+
+    async def _post_multi_target(self, channel, batch, per_target, targets):
+        # One embed per message with a field per language, sent together in as
+        # few messages as Discord's 10 embed / 6000 character limits allow
+        embeds, size = [], 0
+        for i, (message, _) in enumerate(batch):
+            embed = discord.Embed(color=discord.Color.blue())
+            embed.set_author(name=message.author.display_name, icon_url=message.author.display_avatar.url)
+            for target, translations in zip(targets, per_target):
+                if translations[i]:
+                    embed.add_field(name=target["target_name"], value=translations[i][:1024], inline=False)
+            if not embed.fields:
+                continue
+            embed_size = len(message.author.display_name) + sum(len(field.name) + len(field.value) for field in embed.fields)
+            if embeds and (len(embeds) == 10 or size + embed_size > 6000):
+                await channel.send(embeds=embeds)
+                embeds, size = [], 0
+            embeds.append(embed)
+            size += embed_size
+        if embeds:
+            await channel.send(embeds=embeds)
+
+    @staticmethod
+    def _batch_embed(description, target):
+        embed = discord.Embed(description=description, color=discord.Color.blue())
+        embed.set_author(name=f"Translated to {target['target_name']}")
+        return embed
 
     @app_commands.command(name="translate_setup", description="Setup auto-translation for this channel")
-    @app_commands.describe(target_language="The language to translate all messages to", status="Enable or disable auto-translation")
+    @app_commands.describe(target_language="A language to translate messages to", status="Add or remove this language, or turn auto-translation off")
     @app_commands.choices(target_language=[
         app_commands.Choice(name=name, value=code) for name, code in LANGUAGES.items()
     ], status=[
         app_commands.Choice(name="Enable", value="enable"),
-        app_commands.Choice(name="Disable", value="disable")
+        app_commands.Choice(name="Disable", value="disable"),
+        app_commands.Choice(name="Disable all", value="disable_all")
     ])
     @app_commands.checks.has_permissions(manage_channels=True)
     async def translate_setup(self, interaction: discord.Interaction, target_language: app_commands.Choice[str], status: app_commands.Choice[str]):
         await interaction.response.defer(ephemeral=True)
-        configs = load_translate_configs()
-        channel_id = str(interaction.channel_id)
+        configs = self.configs
+        channel_id = interaction.channel_id
+        targets = config_targets(configs[channel_id]) if channel_id in configs else []
+        target_codes = [target["target_lang"] for target in targets]
 
-        if status.value == "disable":
+        if status.value == "disable_all" or (status.value == "disable" and set(target_codes) <= {target_language.value}):
             if channel_id in configs:
                 del configs[channel_id]
-                save_translate_configs(configs)
+                save_translate_configs()
                 await interaction.followup.send("Auto-translation disabled for this channel.")
             else:
                 await interaction.followup.send("Auto-translation was not enabled for this channel.")
             return
 
-        configs[channel_id] = {
-            "target_lang": target_language.value,
-            "target_name": target_language.name
-        }
-        save_translate_configs(configs)
+        if status.value == "disable":
+            if target_language.value not in target_codes:
+                await interaction.followup.send(f"This channel is not being translated to **{target_language.name}**.")
+                return
+            targets = [target for target in targets if target["target_lang"] != target_language.value]
+        elif target_language.value in target_codes:
+            await interaction.followup.send(f"This channel is already translated to **{target_language.name}**.")
+            return
+        elif len(targets) >= TRANSLATE_MAX_TARGETS:
+            await interaction.followup.send(f"A channel can have at most {TRANSLATE_MAX_TARGETS} languages. Disable one first.")
+            return
+        else:
+            targets = targets + [{"target_lang": target_language.value, "target_name": target_language.name}]
+
+        # Replacing the entry (rather than mutating it) keeps in-flight batches consistent
+        configs[channel_id] = {"targets": targets}
+        save_translate_configs()
+
+        names = ", ".join(f"**{target['target_name']}**" for target in targets)
+        if status.value == "disable":
+            await interaction.followup.send(f"Stopped translating to **{target_language.name}**. Messages are still translated to {names}.")
+        else:
+            await interaction.followup.send(
+                f"Auto-translation enabled! All messages in this channel will be translated to {names}."
+            )
+
+    @app_commands.command(name="translate_backend", description="Choose the translation service for this server")
+    @app_commands.describe(backend="Service used for this server's auto-translation")
+    @app_commands.choices(backend=[
+        app_commands.Choice(name=backend.label, value=backend.name) for backend in TRANSLATION_BACKENDS.values()
+    ])
+    @app_commands.guild_only()
+    @app_commands.checks.has_permissions(manage_guild=True)
+    async def translate_backend(self, interaction: discord.Interaction, backend: app_commands.Choice[str]):
+        if backend.value == TRANSLATE_BACKEND:
+            self.guild_backends.pop(interaction.guild_id, None)
+        else:
+            self.guild_backends[interaction.guild_id] = backend.value
+        save_translate_backends()
+        await interaction.response.send_message(f"Auto-translation in this server now uses **{backend.name}**.", ephemeral=True)
 
-        await interaction.followup.send(
-            f"Auto-translation enabled! All messages in this channel will be translated to **{target_language.name}**."
-        )
+    @app_commands.command(name="translate_stats", description="Show translation cache and queue statistics")
+    async def translate_stats(self, interaction: discord.Interaction):
+        cache = self.cache
+        embed = discord.Embed(title="🌐 Translation Cache", color=discord.Color.blue())
+        embed.add_field(name="Entries", value=f"**{len(cache):,}** / {cache.max_entries:,}", inline=True)
+        embed.add_field(name="Hits", value=f"**{cache.hits:,}**", inline=True)
+        embed.add_field(name="Misses", value=f"**{cache.misses:,}**", inline=True)
+        embed.add_field(name="Hit Rate", value=f"**{cache.hit_rate():.1%}**", inline=True)
+        embed.add_field(name="Translator Calls", value=f"**{self.api_calls:,}**", inline=True)
+        embed.add_field(name="Skipped (already in target)", value=f"**{self.skipped_same_language:,}**", inline=True)
+        embed.add_field(name="Skipped (nothing to translate)", value=f"**{self.skipped_untranslatable:,}**", inline=True)
+        embed.add_field(name="Persistent", value="Yes" if TRANSLATE_CACHE_PERSIST else "No", inline=True)
+        embed.add_field(name="Backend", value=self.backend_for(interaction.guild_id).label, inline=True)
+        pool = self.pool
+        embed.add_field(name="Queue Depth", value=f"**{pool.depth:,}** (peak {pool.peak_depth:,}) / {pool.max_queued:,}", inline=True)
+        embed.add_field(name="Queue Wait", value=f"p50 **{pool.wait_percentile(50) * 1000:.0f} ms** • p95 **{pool.wait_percentile(95) * 1000:.0f} ms**", inline=True)
+        embed.add_field(name="Dropped", value=f"**{pool.dropped:,}**", inline=True)
+        await interaction.response.send_message(embed=embed, ephemeral=True)
 
 async def setup(bot: commands.Bot):
     await bot.add_cog(Translation(bot))